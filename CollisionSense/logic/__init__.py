@@ -1,2 +1,4 @@
+from .calibration import CameraCalibration, load_calibration
 from .relative_location import get_relative_coordinates, get_velocity
 from .risk_level import calculate_risk_level
+from .trajectory import TrackHistory, predict_trajectories
@@ -0,0 +1,143 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from .relative_location import get_relative_coordinates
+
+
+DEFAULT_FOCAL_LENGTH = 1000
+
+
+class CameraCalibration:
+    """
+    Camera intrinsics and lens distortion with lookup tables precomputed per frame size.
+
+    A profile file is JSON of the form:
+        {
+            "image_size": [width, height],
+            "camera_matrix": [[fx, 0, cx], [0, fy, cy], [0, 0, 1]],
+            "dist_coeffs": [k1, k2, p1, p2, k3]
+        }
+    "image_size" is the resolution the camera was calibrated at; frames of another
+    size get the intrinsics scaled to match.
+    """
+
+    def __init__(self, camera_matrix=None, dist_coeffs=None, image_size=None):
+        self.camera_matrix = (
+            None if camera_matrix is None else np.asarray(camera_matrix, dtype=float)
+        )
+        self.dist_coeffs = np.asarray(
+            dist_coeffs if dist_coeffs is not None else np.zeros(5), dtype=float
+        )
+        self.image_size = tuple(image_size) if image_size else None
+
+        self.size = None
+        self.scaled_matrix = None
+        self.map1 = None
+        self.map2 = None
+        self.ray_table = None
+
+    @classmethod
+    def from_profile(cls, path):
+        """Load a calibration profile from a JSON file"""
+        with open(path, "r") as f:
+            profile = json.load(f)
+
+        return cls(
+            camera_matrix=profile["camera_matrix"],
+            dist_coeffs=profile.get("dist_coeffs"),
+            image_size=profile.get("image_size"),
+        )
+
+    def matrix_for_size(self, width, height):
+        """Return the camera matrix for frames of the given size"""
+        if self.camera_matrix is None:
+            # Plain pinhole camera with the principal point at the image center
+            return np.array(
+                [
+                    [DEFAULT_FOCAL_LENGTH, 0, width / 2],
+                    [0, DEFAULT_FOCAL_LENGTH, height / 2],
+                    [0, 0, 1],
+                ],
+                dtype=float,
+            )
+
+        matrix = self.camera_matrix.copy()
+        if self.image_size and self.image_size != (width, height):
+            calib_width, calib_height = self.image_size
+            matrix[0] *= width / calib_width
+            matrix[1] *= height / calib_height
+            matrix[2] = (0, 0, 1)
+        return matrix
+
+    def prepare(self, width, height):
+        """
+        Precompute the undistortion maps and per-pixel ray table for a frame size.
+
+        Only does work the first time a size is seen, so it is cheap to call per frame.
+        """
+        if self.size == (width, height):
+            return
+
+        matrix = self.matrix_for_size(width, height)
+
+        self.map1, self.map2 = cv2.initUndistortRectifyMap(
+            matrix, self.dist_coeffs, None, matrix, (width, height), cv2.CV_16SC2
+        )
+
+        # Normalized (x/z, y/z) ray through the center of every pixel
+        xs, ys = np.meshgrid(
+            np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32)
+        )
+        pixels = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+        rays = cv2.undistortPoints(pixels, matrix, self.dist_coeffs)
+        self.ray_table = rays.reshape(height, width, 2)
+
+        self.scaled_matrix = matrix
+        self.size = (width, height)
+
+    @property
+    def focal_length(self):
+        """Horizontal focal length in pixels at the prepared frame size"""
+        if self.scaled_matrix is not None:
+            return float(self.scaled_matrix[0, 0])
+        if self.camera_matrix is not None:
+            return float(self.camera_matrix[0, 0])
+        return DEFAULT_FOCAL_LENGTH
+
+    def undistort(self, frame):
+        """Undistort a frame with the precomputed remap tables"""
+        height, width = frame.shape[:2]
+        self.prepare(width, height)
+        return cv2.remap(frame, self.map1, self.map2, cv2.INTER_LINEAR)
+
+    def relative_coordinates(self, bbox, image_width, image_height, known_width=1.8):
+        """Relative (x, y, z) of a bounding box using the precomputed ray table"""
+        self.prepare(image_width, image_height)
+        return get_relative_coordinates(
+            bbox,
+            image_width,
+            image_height,
+            self.focal_length,
+            known_width=known_width,
+            ray_table=self.ray_table,
+        )
+
+
+def load_calibration(path=None):
+    """
+    Load the camera calibration profile.
+
+    Args:
+        path: Profile path; defaults to the COLLISION_SENSE_CAMERA_PROFILE environment
+              variable. Without a profile a distortion-free pinhole camera is used.
+
+    Returns:
+        calibration: CameraCalibration instance
+    """
+    path = path or os.environ.get("COLLISION_SENSE_CAMERA_PROFILE")
+    if not path:
+        return CameraCalibration()
+    return CameraCalibration.from_profile(path)
@@ -2,7 +2,7 @@ import numpy as np
 
 
 def get_relative_coordinates(
-    bbox, image_width, image_height, focal_length, known_width=1.8
+    bbox, image_width, image_height, focal_length, known_width=1.8, ray_table=None
 ):
     """
     Calculate the relative 3D coordinates (x, y, z) of an object from the camera.
@@ -13,6 +13,8 @@ def get_relative_coordinates(
         image_height: Height of the camera frame in pixels
         focal_length: Focal length of the camera in pixels
         known_width: Known width of the object in meters (default: 1.8m for average car)
+        ray_table: Optional (height, width, 2) array of undistorted normalized rays per
+                   pixel (see CameraCalibration); replaces the pinhole formula when given
 
     Returns:
         Tuple (x, y, z) where:
@@ -22,6 +24,9 @@ def get_relative_coordinates(
     """
     x1, y1, x2, y2 = bbox
 
+    if ray_table is not None:
+        return _relative_coordinates_from_rays(bbox, ray_table, known_width)
+
     # Calculate center of the bounding box
     center_x = (x1 + x2) / 2
     center_y = (y1 + y2) / 2
@@ -41,6 +46,28 @@ def get_relative_coordinates(
     return (x, y, z)
 
 
+def _relative_coordinates_from_rays(bbox, ray_table, known_width):
+    """Relative (x, y, z) from the undistorted rays through the bounding box"""
+    height, width = ray_table.shape[:2]
+    x1, y1, x2, y2 = bbox
+
+    # Sample rays on the center row of the box, clamped to the frame
+    row = int(min(max((y1 + y2) // 2, 0), height - 1))
+    col = int(min(max((x1 + x2) // 2, 0), width - 1))
+    left = int(min(max(x1, 0), width - 1))
+    right = int(min(max(x2, 0), width - 1))
+
+    # Angular width of the box in normalized image coordinates
+    ray_width = ray_table[row, right, 0] - ray_table[row, left, 0]
+    z = known_width / ray_width
+
+    center_ray = ray_table[row, col]
+    x = float(center_ray[0] * z)
+    y = float(center_ray[1] * z)
+
+    return (x, y, float(z))
+
+
 def get_velocity(initial_pos, new_pos, time_elapsed):
     """
     Calculate the velocity of an object.
@@ -13,7 +13,7 @@ def calculate_velocity_magnitude(velocity):
     return math.sqrt(vx**2 + vz**2)
 
 
-def calculate_risk_level(car_pos, car_vel, max_deceleration=7):
+def calculate_risk_level(car_pos, car_vel, max_deceleration=7, predicted_approach=None):
     """
     Calculate risk level between ego car (at origin) and another car based on relative position and velocities.
 
@@ -21,6 +21,8 @@ def calculate_risk_level(car_pos, car_vel, max_deceleration=7):
     - car_pos: (x, z) position of other car relative to ego car at (0,0)
     - car_vel: (vx, vz) velocity of other car relative to ego car
     - max_deceleration: maximum deceleration rate in m/s²
+    - predicted_approach: optional (min_distance, t_closest) from a predicted path
+      (see trajectory.predict_trajectories); replaces the constant-velocity estimate
 
     Returns:
     - risk_level: A value from 0 to 100
@@ -56,6 +58,14 @@ def calculate_risk_level(car_pos, car_vel, max_deceleration=7):
         min_distance = distance
         t_closest = float("inf")
 
+    if predicted_approach is not None:
+        # The predicted path starts one step ahead, so the current position still counts
+        predicted_distance, predicted_t = predicted_approach
+        if predicted_distance < distance:
+            min_distance, t_closest = float(predicted_distance), float(predicted_t)
+        else:
+            min_distance, t_closest = distance, 0
+
     # Safety threshold for minimum passing distance (m)
     # Increase this value for pedestrians if needed
     safe_passing_distance = 3.0
@@ -0,0 +1,285 @@
+import numpy as np
+
+
+def stack_histories(histories, max_len=10):
+    """
+    Pack per-track position histories into padded arrays for a batched fit.
+
+    Args:
+        histories: List of sequences of (t, x, z) samples, oldest first, one per track
+        max_len: Maximum number of most recent samples kept per track
+
+    Returns:
+        Tuple (times, positions, mask) where:
+        - times: (N, M) sample times relative to each track's newest sample
+        - positions: (N, M, 2) sample positions (x, z) in meters
+        - mask: (N, M) 1.0 for real samples, 0.0 for padding
+    """
+    n = len(histories)
+    m = max(1, min(max_len, max((len(h) for h in histories), default=1)))
+
+    times = np.zeros((n, m))
+    positions = np.zeros((n, m, 2))
+    mask = np.zeros((n, m))
+
+    for i, history in enumerate(histories):
+        samples = np.asarray(history[-m:], dtype=float).reshape(-1, 3)
+        count = len(samples)
+        if count == 0:
+            continue
+
+        # Right-align so the newest sample is always in the last column
+        times[i, m - count :] = samples[:, 0] - samples[-1, 0]
+        positions[i, m - count :] = samples[:, 1:]
+        mask[i, m - count :] = 1.0
+
+    return times, positions, mask
+
+
+def fit_constant_acceleration(times, positions, mask):
+    """
+    Fit constant-acceleration motion to every track in one least-squares solve.
+
+    Each track is modelled as p(t) = p0 + v*t + 0.5*a*t^2 with t = 0 at the newest
+    sample. Tracks with three or more samples get the full fit; with two samples
+    they fall back to constant velocity and with one sample to stationary.
+
+    Args:
+        times: (N, M) sample times relative to the newest sample in seconds
+        positions: (N, M, 2) sample positions (x, z) in meters
+        mask: (N, M) sample weights (0.0 for padding)
+
+    Returns:
+        Tuple (p0, v, a), each an (N, 2) array of position, velocity and acceleration
+    """
+    n = len(times)
+    valid = mask > 0
+    counts = valid.sum(axis=1)
+    rows = np.arange(n)
+
+    # Normalise time by each track's sample span so the columns are O(1)
+    span = np.where(valid, np.abs(times), 0.0).max(axis=1, initial=0.0)
+    span = np.where(span > 0, span, 1.0)
+    s = times / span[:, None]
+
+    # Design matrix (N, M, 3) with columns [1, s, s^2 / 2]
+    design = np.stack([np.ones_like(s), s, 0.5 * s**2], axis=-1)
+    weighted = design * mask[..., None]
+
+    # Normal equations for all tracks at once: (N, 3, 3) and (N, 3, 2)
+    weighted_t = weighted.transpose(0, 2, 1)
+    lhs = weighted_t @ design
+    rhs = weighted_t @ positions
+
+    # Tracks too short for the full fit get an identity system; they are
+    # replaced by the explicit fallbacks below
+    short = counts < 3
+    lhs[short] = np.eye(3)
+    rhs[short] = 0.0
+
+    coeffs = np.linalg.solve(lhs, rhs)
+    p0 = coeffs[:, 0]
+    v = coeffs[:, 1] / span[:, None]
+    a = coeffs[:, 2] / span[:, None] ** 2
+
+    # Newest and oldest real sample of every track
+    last = valid.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    first = np.argmax(valid, axis=1)
+    p_last = positions[rows, last]
+    p_first = positions[rows, first]
+
+    # Two samples: constant velocity through both
+    two = counts == 2
+    elapsed = times[rows, last] - times[rows, first]
+    elapsed = np.where(two & (elapsed != 0), elapsed, 1.0)
+    p0 = np.where(short[:, None], p_last, p0)
+    v = np.where(two[:, None], (p_last - p_first) / elapsed[:, None], v)
+    v = np.where((counts < 2)[:, None], 0.0, v)
+    a = np.where(short[:, None], 0.0, a)
+
+    return p0, v, a
+
+
+def rollout(p0, v, a, horizon=20, dt=0.1):
+    """
+    Roll every fitted track forward over a fixed horizon.
+
+    Args:
+        p0: (N, 2) current positions (x, z)
+        v: (N, 2) velocities (vx, vz)
+        a: (N, 2) accelerations (ax, az)
+        horizon: Number of future steps K
+        dt: Time between steps in seconds
+
+    Returns:
+        Tuple (paths, horizon_times) where paths is (N, K, 2) and horizon_times is (K,)
+    """
+    horizon_times = dt * np.arange(1, horizon + 1)
+    tau = horizon_times[None, :, None]
+
+    paths = p0[:, None, :] + v[:, None, :] * tau + 0.5 * a[:, None, :] * tau**2
+
+    return paths, horizon_times
+
+
+def closest_approach(paths, horizon_times):
+    """
+    Find the closest predicted approach of every track to the ego car at the origin.
+
+    Args:
+        paths: (N, K, 2) predicted positions (x, z)
+        horizon_times: (K,) time of each step in seconds
+
+    Returns:
+        Tuple (min_distance, t_closest), each an (N,) array
+    """
+    distances = np.hypot(paths[..., 0], paths[..., 1])
+    closest = np.argmin(distances, axis=1)
+    rows = np.arange(len(paths))
+
+    return distances[rows, closest], horizon_times[closest]
+
+
+def predict_from_arrays(times, positions, mask, horizon=20, dt=0.1):
+    """
+    Predict future paths for all tracks from padded history arrays.
+
+    Args:
+        times: (N, M) sample times relative to each track's newest sample
+        positions: (N, M, 2) sample positions (x, z) in meters
+        mask: (N, M) 1.0 for real samples, 0.0 for padding
+        horizon: Number of future steps K
+        dt: Time between steps in seconds
+
+    Returns:
+        Dictionary with:
+        - position: (N, 2) fitted current positions
+        - velocity: (N, 2) fitted velocities
+        - acceleration: (N, 2) fitted accelerations
+        - paths: (N, K, 2) predicted positions
+        - min_distance: (N,) closest predicted distance to the ego car
+        - t_closest: (N,) time of the closest predicted approach
+    """
+    p0, v, a = fit_constant_acceleration(times, positions, mask)
+    paths, horizon_times = rollout(p0, v, a, horizon, dt)
+
+    if len(paths):
+        min_distance, t_closest = closest_approach(paths, horizon_times)
+    else:
+        min_distance, t_closest = np.zeros(0), np.zeros(0)
+
+    return {
+        "position": p0,
+        "velocity": v,
+        "acceleration": a,
+        "paths": paths,
+        "min_distance": min_distance,
+        "t_closest": t_closest,
+    }
+
+
+def predict_trajectories(histories, horizon=20, dt=0.1, max_len=10):
+    """
+    Predict future paths for all tracks from their recent position histories.
+
+    Args:
+        histories: List of sequences of (t, x, z) samples, oldest first, one per track
+        horizon: Number of future steps K
+        dt: Time between steps in seconds
+        max_len: Maximum number of most recent samples used per track
+
+    Returns:
+        Dictionary as returned by predict_from_arrays
+    """
+    times, positions, mask = stack_histories(histories, max_len)
+    return predict_from_arrays(times, positions, mask, horizon, dt)
+
+
+class TrackHistory:
+    """
+    Recent (t, x, z) samples of every live track in preallocated arrays.
+
+    Each track id owns a row (slot) of fixed-width arrays with its newest sample
+    in the last column, so updating and fitting all tracks are array operations
+    rather than per-track Python work.
+    """
+
+    def __init__(self, max_len=10, capacity=64):
+        self.max_len = max_len
+        self.slots = {}
+        self.times = np.zeros((capacity, max_len))
+        self.positions = np.zeros((capacity, max_len, 2))
+        self.counts = np.zeros(capacity, dtype=int)
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def clear(self):
+        """Forget every track"""
+        self.free.extend(self.slots.values())
+        self.counts[:] = 0
+        self.slots = {}
+
+    def _grow(self):
+        capacity = len(self.counts)
+        self.times = np.concatenate([self.times, np.zeros_like(self.times)])
+        self.positions = np.concatenate([self.positions, np.zeros_like(self.positions)])
+        self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def update(self, ids, times, positions):
+        """
+        Append one sample per track and drop tracks that were not updated.
+
+        Args:
+            ids: Sequence of N unique track ids
+            times: (N,) sample times in seconds
+            positions: (N, 2) sample positions (x, z)
+
+        Returns:
+            slots: (N,) row of each track in the history arrays
+        """
+        # Forget tracks that are no longer detected
+        for track_id in self.slots.keys() - set(ids):
+            slot = self.slots.pop(track_id)
+            self.counts[slot] = 0
+            self.free.append(slot)
+
+        slot_list = []
+        for track_id in ids:
+            slot = self.slots.get(track_id)
+            if slot is None:
+                if not self.free:
+                    self._grow()
+                slot = self.free.pop()
+                self.slots[track_id] = slot
+            slot_list.append(slot)
+
+        slots = np.asarray(slot_list, dtype=int)
+        times = np.asarray(times, dtype=float)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+
+        counts = self.counts[slots]
+        newest = self.times[slots, -1]
+        # Time went backwards (e.g. the source restarted): start the track over
+        counts = np.where((counts > 0) & (times < newest), 0, counts)
+        # Same detection seen again replaces the newest sample instead of shifting
+        shift = slots[(counts == 0) | (times != newest)]
+
+        self.times[shift, :-1] = self.times[shift, 1:]
+        self.positions[shift, :-1] = self.positions[shift, 1:]
+        self.times[slots, -1] = times
+        self.positions[slots, -1] = positions
+        self.counts[slots] = np.minimum(
+            np.where(np.isin(slots, shift), counts + 1, counts), self.max_len
+        )
+
+        return slots
+
+    def predict(self, slots, horizon=20, dt=0.1):
+        """Predict paths for the tracks in `slots` (see predict_from_arrays)"""
+        times = self.times[slots] - self.times[slots, -1:]
+        columns = np.arange(self.max_len)
+        mask = (columns >= self.max_len - self.counts[slots][:, None]).astype(float)
+        return predict_from_arrays(times, self.positions[slots], mask, horizon, dt)
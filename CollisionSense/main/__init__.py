@@ -1,2 +1,15 @@
+from .events import RiskEventServer, start_event_server
 from .gui import show_gui
 from .load import stream_to_virtual_cam
+from .reader import PrefetchingVideoReader, VideoFrame
+from .scheduler import FrameScheduler, get_deadline
+from .sinks import (
+    FrameSink,
+    NullSink,
+    SharedMemorySink,
+    SharedMemorySource,
+    VideoFileSink,
+    VirtualCamSink,
+    create_sinks,
+)
+from .trace import Tracer, export_trace, tracer
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+
+
+class _Client:
+    """A connected subscriber with its own bounded, drop-oldest message buffer"""
+
+    def __init__(self, writer, buffer_size):
+        self.writer = writer
+        self.buffer = deque(maxlen=buffer_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.task = None
+
+
+class RiskEventServer:
+    """
+    Publishes per-frame risk events to local clients over a UNIX or TCP socket.
+
+    Runs its own asyncio loop on a daemon thread. `publish` is safe to call from
+    any thread and never blocks: each frame is encoded once as a JSON line and
+    appended to every client's bounded buffer, dropping that client's oldest
+    messages when it cannot keep up.
+    """
+
+    def __init__(self, address, buffer_size=64):
+        """
+        Args:
+            address: "unix:/path/to/socket" or "tcp:host:port"
+            buffer_size: Maximum number of pending frames kept per client
+        """
+        self.address = address
+        self.buffer_size = buffer_size
+        self.clients = set()
+        self.loop = None
+        self.server = None
+        self.stopping = None
+        self.thread = None
+        self.started = threading.Event()
+        self.error = None
+
+    def start(self):
+        """
+        Start serving on a background thread.
+
+        Raises:
+            The error that stopped the server from listening (e.g. an unknown
+            address scheme or a port already in use)
+        """
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            self.thread.join()
+            raise self.error
+
+    def stop(self):
+        """Stop serving and disconnect all clients"""
+        loop = self.loop
+        if loop and self.stopping:
+            try:
+                loop.call_soon_threadsafe(self.stopping.set)
+            except RuntimeError:
+                # The loop already finished
+                pass
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        self.loop = loop
+        try:
+            loop.run_until_complete(self._main())
+        except Exception as e:
+            # Handed to start() rather than lost as a thread traceback
+            self.error = e
+        finally:
+            # publish() and stop() see a stopped server rather than a closed loop
+            self.loop = None
+            self.started.set()
+            loop.close()
+
+    async def _main(self):
+        self.stopping = asyncio.Event()
+        self.server = await self._serve()
+        self.started.set()
+
+        await self.stopping.wait()
+
+        self.server.close()
+        tasks = [client.task for client in self.clients]
+        # Wake every client so it sees the stop flag and exits
+        for client in list(self.clients):
+            client.ready.set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=1)
+            # Clients stuck in drain() on a full socket are dropped outright
+            for client in list(self.clients):
+                client.writer.transport.abort()
+            if pending:
+                await asyncio.wait(pending)
+        await self.server.wait_closed()
+
+    async def _serve(self):
+        kind, _, target = self.address.partition(":")
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            return await asyncio.start_unix_server(self._handle_client, path=target)
+        if kind == "tcp":
+            host, _, port = target.rpartition(":")
+            return await asyncio.start_server(
+                self._handle_client, host or "127.0.0.1", int(port)
+            )
+        raise ValueError(f"Unknown event server address: {self.address}")
+
+    async def _handle_client(self, reader, writer):
+        client = _Client(writer, self.buffer_size)
+        client.task = asyncio.current_task()
+        self.clients.add(client)
+        try:
+            while not writer.is_closing() and not self.stopping.is_set():
+                await client.ready.wait()
+                client.ready.clear()
+                if self.stopping.is_set():
+                    break
+                while client.buffer:
+                    writer.write(client.buffer.popleft())
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def _enqueue(self, message):
+        for client in self.clients:
+            if len(client.buffer) == client.buffer.maxlen:
+                client.dropped += 1
+            client.buffer.append(message)
+            client.ready.set()
+
+    def publish(self, frame_id, timestamp, objects):
+        """
+        Publish the risk events of one frame.
+
+        Args:
+            frame_id: Frame identifier (or None)
+            timestamp: Frame time in seconds
+            objects: List of dicts with id, label, risk, position (x, y, z),
+                     fitted_velocity (vx, vz; the velocity the risk is scored on),
+                     measured_velocity (raw frame-to-frame vx, vy, vz) and late
+        """
+        loop = self.loop
+        if not loop or not self.clients:
+            return
+
+        message = (
+            json.dumps(
+                {"frame": frame_id, "time": timestamp, "objects": objects},
+                separators=(",", ":"),
+            )
+            + "\n"
+        ).encode()
+        try:
+            loop.call_soon_threadsafe(self._enqueue, message)
+        except RuntimeError:
+            # Stopped while this frame was being encoded
+            pass
+
+
+def start_event_server(address=None):
+    """
+    Start the risk event server if an address is configured.
+
+    Args:
+        address: Socket address; defaults to the COLLISION_SENSE_EVENTS environment
+                 variable (e.g. "unix:/tmp/collisionsense.sock" or "tcp:127.0.0.1:8765")
+
+    Returns:
+        server: Running RiskEventServer, or None if no address is configured
+    """
+    address = address or os.environ.get("COLLISION_SENSE_EVENTS")
+    if not address:
+        return None
+
+    server = RiskEventServer(address)
+    server.start()
+    return server
@@ -4,17 +4,22 @@ from PIL import Image, ImageTk
 import queue
 import numpy as np
 from CollisionSense.logic import (
-    get_relative_coordinates,
+    load_calibration,
     get_velocity,
     calculate_risk_level,
+    TrackHistory,
 )
 import os
-from time import time
+from collections import OrderedDict
+from time import perf_counter
+from .scheduler import get_deadline
+from .trace import tracer
 
 
 class CollisionSenseGUI:
-    def __init__(self, bbox_queue):
+    def __init__(self, bbox_queue, event_server=None):
         self.bbox_queue = bbox_queue
+        self.event_server = event_server
         self.root = None
         self.cap = None
         self.lbl = None
@@ -22,6 +27,28 @@ class CollisionSenseGUI:
 
         self.label_to_width = {"car": 1.8, "person": 0.15}
 
+        # Results older than this when drawn are marked late
+        self.deadline = get_deadline()
+
+        # Lens model; lookup tables are built once per frame size
+        self.calibration = load_calibration()
+
+        # Recent (t, x, z) samples per track id for trajectory prediction
+        self.track_history = TrackHistory(max_len=10)
+        # Source loop the history belongs to; the tracker reuses ids after a loop
+        self.loop = 0
+
+        # Rendered debug text: glyphs and static segments such as labels
+        self.text_sprites = OrderedDict()
+        self.max_text_sprites = 512
+        # Shared line box: black background from 5px above the text to below
+        # the deepest descender
+        (_, text_height), descent = cv2.getTextSize(
+            "gjpqy,", cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1
+        )
+        self.text_ascent = text_height + 5
+        self.text_descent = descent
+
     @staticmethod
     def is_debug():
         return os.environ.get("COLLISION_SENSE_DEBUG") == "true"
@@ -72,28 +99,31 @@ class CollisionSenseGUI:
 
     def show_frame(self):
         """Process and display a single frame with bounding boxes"""
-        ret, frame = self.cap.read()
+        with tracer.span("gui.capture"):
+            ret, frame = self.cap.read()
         if ret:
             # Convert the frame (BGR to RGB)
             cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-            # Try to get bbox data from queue
+            # Try to get the latest frame's detections from the queue
             try:
-                bbox_data = self.bbox_queue.get_nowait()
-                # Draw bounding boxes on the frame
-                self.process_bounding_boxes(cv2image, bbox_data)
+                detections = self.bbox_queue.get_nowait()
             except queue.Empty:
                 # No new bbox data available
-                pass
+                detections = None
+
+            # Frame id of the detections drawn on this frame, for tracing
+            frame_id = detections["frame_id"] if detections else None
 
             # Get current dimensions of the label
             label_width = self.lbl.winfo_width()
             label_height = self.lbl.winfo_height()
 
+            img_height, img_width = cv2image.shape[:2]
+
             # Ensure we have valid dimensions (on first run they may be 1)
             if label_width > 1 and label_height > 1:
                 # Resize frame to fit label while maintaining aspect ratio
-                img_height, img_width = cv2image.shape[:2]
                 ratio = min(label_width / img_width, label_height / img_height)
                 new_width = int(img_width * ratio)
                 new_height = int(img_height * ratio)
@@ -101,28 +131,70 @@ class CollisionSenseGUI:
                     cv2image, (new_width, new_height), interpolation=cv2.INTER_AREA
                 )
 
+            if detections is not None:
+                # Draw the overlay at display resolution, geometry from the source size
+                with tracer.span("process_bounding_boxes", frame_id):
+                    self.process_bounding_boxes(
+                        cv2image,
+                        detections["bbox_data"],
+                        source_size=(img_width, img_height),
+                        frame_id=frame_id,
+                        timestamp=detections["time"],
+                    )
+
             # Display the frame
-            img = Image.fromarray(cv2image)
-            imgtk = ImageTk.PhotoImage(image=img)
+            with tracer.span("imagetk", frame_id):
+                img = Image.fromarray(cv2image)
+                imgtk = ImageTk.PhotoImage(image=img)
             self.lbl.imgtk = imgtk  # keep a reference
             self.lbl.configure(image=imgtk)
 
         self.lbl.after(10, self.show_frame)
 
-    def process_bounding_boxes(self, cv2image, bbox_data):
-        """Process and draw bounding boxes on the image"""
-        img_height, img_width, _ = cv2image.shape
-
+    def process_bounding_boxes(
+        self, cv2image, bbox_data, source_size=None, frame_id=None, timestamp=None
+    ):
+        """
+        Process and draw bounding boxes on the image.
+
+        `source_size` is the (width, height) of the frame the boxes were detected
+        on; when `cv2image` is a resized copy, positions are still computed at the
+        source size and boxes are scaled to the image for drawing. `frame_id` and
+        `timestamp` identify the frame in published risk events, including frames
+        without detections.
+        """
+        display_height, display_width, _ = cv2image.shape
+        img_width, img_height = source_size or (display_width, display_height)
+        scale_x = display_width / img_width
+        scale_y = display_height / img_height
+
+        # First pass: positions for every object, so all tracks are predicted at once
+        all_coords = []
         for obj in bbox_data:
-            x1, y1, x2, y2 = obj["bbox"]
-            conf = obj["confidence"]
-
             # Get width based on object label with fallback to default value if label not found
             width = self.label_to_width.get(obj["label"], 1.8)
 
-            relative_coords = get_relative_coordinates(
-                obj["bbox"], img_width, img_height, focal_length=1000, known_width=width
+            relative_coords = self.calibration.relative_coordinates(
+                obj["bbox"], img_width, img_height, known_width=width
+            )
+            all_coords.append(relative_coords)
+
+        prediction = self.predict_tracks(bbox_data, all_coords)
+        events = []
+
+        # Late if inference already missed the deadline or the result sat in the queue
+        now = perf_counter()
+        for obj in bbox_data:
+            captured_at = obj.get("captured_at")
+            obj["late"] = obj.get("late", False) or (
+                captured_at is not None and now - captured_at > self.deadline
+            )
+
+        for i, (obj, relative_coords) in enumerate(zip(bbox_data, all_coords)):
+            x1, y1, x2, y2 = self.scale_bbox(
+                obj["bbox"], scale_x, scale_y, display_width, display_height
             )
+            conf = obj["confidence"]
 
             # Adjust beta based on confidence (lower confidence results in a lower beta)
             beta = self.normalize_with_range(0.75, 1.0, 0.0, 75.0, conf)
@@ -130,7 +202,7 @@ class CollisionSenseGUI:
             bright_roi = cv2.convertScaleAbs(roi, alpha=1.0, beta=beta)
 
             # Create a mask with rounded edges
-            mask = self.create_rounded_mask(roi)
+            mask = self.create_rounded_mask(roi, radius=max(1, round(20 * scale_x)))
 
             # Blend the brightened ROI with the original ROI using the mask
             mask_gray = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
@@ -145,11 +217,32 @@ class CollisionSenseGUI:
                 pass  # process warning system
 
             velocity = self.calculate_velocity(
-                obj, relative_coords, img_width, img_height
+                obj, relative_coords, img_width, img_height, self.calibration
             )
 
+            # Score risk on the fitted motion and predicted path of this track
+            fitted_velocity = prediction["velocity"][i]
             risk = calculate_risk_level(
-                (relative_coords[0], relative_coords[2]), (velocity[0], velocity[2])
+                (relative_coords[0], relative_coords[2]),
+                (fitted_velocity[0], fitted_velocity[1]),
+                predicted_approach=(
+                    prediction["min_distance"][i],
+                    prediction["t_closest"][i],
+                ),
+            )
+
+            events.append(
+                {
+                    "id": obj["id"],
+                    "label": obj["label"],
+                    "risk": risk,
+                    "position": [round(float(c), 3) for c in relative_coords],
+                    # Fitted (vx, vz) the risk is scored on, and the raw
+                    # frame-to-frame (vx, vy, vz) shown in the debug overlay
+                    "fitted_velocity": [round(float(c), 3) for c in fitted_velocity],
+                    "measured_velocity": [round(float(c), 3) for c in velocity],
+                    "late": obj["late"],
+                }
             )
 
             # Prepare the ROI to be applied
@@ -167,12 +260,41 @@ class CollisionSenseGUI:
                     cv2image, obj, relative_coords, x1, y1, velocity, risk, obj["label"]
                 )
 
+        if self.event_server:
+            self.event_server.publish(frame_id, timestamp, events)
+
+    def predict_tracks(self, bbox_data, all_coords):
+        """Update per-track position history and predict paths for all tracks"""
+        loop = bbox_data[0].get("loop", 0) if bbox_data else self.loop
+        if loop != self.loop:
+            # The source restarted and the tracker was reset, so ids now name
+            # different objects
+            self.track_history.clear()
+            self.loop = loop
+
+        slots = self.track_history.update(
+            [obj["id"] for obj in bbox_data],
+            [obj["time"] for obj in bbox_data],
+            [(coords[0], coords[2]) for coords in all_coords],
+        )
+        return self.track_history.predict(slots)
+
+    @staticmethod
+    def scale_bbox(bbox, scale_x, scale_y, width, height):
+        """Scale a source bounding box to display coordinates, clamped to the image"""
+        x1, y1, x2, y2 = bbox
+        # Keep at least one pixel so the ROI is never empty
+        x1 = min(max(int(x1 * scale_x), 0), width - 1)
+        y1 = min(max(int(y1 * scale_y), 0), height - 1)
+        x2 = min(max(int(x2 * scale_x), x1 + 1), width)
+        y2 = min(max(int(y2 * scale_y), y1 + 1), height)
+        return x1, y1, x2, y2
+
     @staticmethod
-    def create_rounded_mask(roi):
-        """Create a mask with rounded edges for the ROI"""
+    def create_rounded_mask(roi, radius=20):
+        """Create a mask with rounded edges for the ROI (radius sets the curvature)"""
         mask = np.zeros_like(roi, dtype=np.uint8)
         h, w = roi.shape[:2]
-        radius = 20  # adjust for desired curvature
 
         # Fill rectangular areas
         cv2.rectangle(mask, (radius, 0), (w - radius, h), (255, 255, 255), -1)
@@ -217,18 +339,46 @@ class CollisionSenseGUI:
         # Put object ID on the frame
         text_position = (x1, y1 - 10 if y1 - 10 > 10 else y1 + 10)
 
-        # Add black background rectangle for better text visibility
-        text = f"Label: {label} | V: {velocity[0]:.2f}, {velocity[1]:.2f}, {velocity[2]:.2f} | POS: {relative_coords[0]:.2f}, {relative_coords[1]:.2f}, {relative_coords[2]:.2f} | Risk: {risk}"
-        (text_width, text_height), baseline = cv2.getTextSize(
-            text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1
+        # Static segments are cached whole; numbers change every frame, so they
+        # are assembled from cached glyphs instead of being rendered
+        pieces = [f"Label: {label} | V: "]
+        pieces.extend(
+            f"{velocity[0]:.2f}, {velocity[1]:.2f}, {velocity[2]:.2f}"
+        )
+        pieces.append(" | POS: ")
+        pieces.extend(
+            f"{relative_coords[0]:.2f}, {relative_coords[1]:.2f}, {relative_coords[2]:.2f}"
+        )
+        pieces.append(f" | Risk: {risk}")
+        if obj.get("late"):
+            pieces.append(" | LATE")
+
+        line = np.concatenate([self.get_text_sprite(piece) for piece in pieces], axis=1)
+        self.blit(cv2image, line, text_position[0], text_position[1] - self.text_ascent)
+
+    def get_text_sprite(self, text):
+        """
+        Return the cached sprite for a piece of debug text.
+
+        Every sprite has the same height (text_ascent above the baseline) and is
+        as wide as the text's advance, so sprites can be placed side by side.
+        """
+        sprite = self.text_sprites.get(text)
+        if sprite is not None:
+            self.text_sprites.move_to_end(text)
+            return sprite
+
+        (text_width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        # getTextSize pads the width by the thickness; drop it so glyphs set side
+        # by side are spaced like a single putText call
+        sprite = np.zeros(
+            (self.text_ascent + self.text_descent, max(text_width - 1, 1), 3),
+            dtype=np.uint8,
         )
-        top_left = (text_position[0], text_position[1] - text_height - 5)
-        bottom_right = (text_position[0] + text_width, text_position[1] + baseline)
-        cv2.rectangle(cv2image, top_left, bottom_right, (0, 0, 0), -1)
         cv2.putText(
-            cv2image,
+            sprite,
             text,
-            text_position,
+            (0, self.text_ascent),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.5,
             (0, 255, 0),
@@ -236,18 +386,43 @@ class CollisionSenseGUI:
             cv2.LINE_AA,
         )
 
+        self.text_sprites[text] = sprite
+        if len(self.text_sprites) > self.max_text_sprites:
+            self.text_sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def blit(image, sprite, x, y):
+        """Copy a sprite onto the image at (x, y), clipped to the image bounds"""
+        img_height, img_width = image.shape[:2]
+        h, w = sprite.shape[:2]
+
+        left, top = max(x, 0), max(y, 0)
+        right, bottom = min(x + w, img_width), min(y + h, img_height)
+        if right <= left or bottom <= top:
+            return
+
+        image[top:bottom, left:right] = sprite[
+            top - y : bottom - y, left - x : right - x
+        ]
+
     @staticmethod
-    def calculate_velocity(obj, relative_coords, img_width, img_height):
+    def calculate_velocity(obj, relative_coords, img_width, img_height, calibration):
         """Calculate velocity of an object"""
-        if obj["old_bbox"] and obj["prev_time"]:
-            old_relative_coords = get_relative_coordinates(
-                obj["old_bbox"], img_width, img_height, focal_length=1000
+        if (
+            obj["old_bbox"]
+            and obj["prev_time"] is not None
+            and obj["time"] > obj["prev_time"]
+        ):
+            old_relative_coords = calibration.relative_coordinates(
+                obj["old_bbox"], img_width, img_height
             )
 
+            # Both times are source timestamps of the frames the boxes came from
             velocity = get_velocity(
                 old_relative_coords,
                 relative_coords,
-                time() - obj["prev_time"],
+                obj["time"] - obj["prev_time"],
             )
             obj["prev_velocity"] = velocity
             return velocity
@@ -271,6 +446,6 @@ class CollisionSenseGUI:
 
 
 # NOTE - Meant to be run in the MAIN THREAD
-def show_gui(bbox_queue):
-    app = CollisionSenseGUI(bbox_queue)
+def show_gui(bbox_queue, event_server=None):
+    app = CollisionSenseGUI(bbox_queue, event_server)
     app.start()
@@ -1,94 +1,192 @@
 import queue
 import cv2
-import pyvirtualcam
-from ultralytics import YOLO
-from time import time
+from time import perf_counter
+from CollisionSense.logic import load_calibration
+from .reader import PrefetchingVideoReader
+from .scheduler import FrameScheduler
+from .sinks import create_sinks, send_to_sinks
+from .trace import tracer
+
+
+def attach_history(bbox_data, object_history):
+    """
+    Link each detection to the same track in the previous frame.
+
+    Args:
+        bbox_data: List of bbox info dicts for the current frame
+        object_history: Dictionary of track id -> bbox info from the previous frame
+
+    Returns:
+        object_history: History for the next frame, holding only tracks seen in this one
+    """
+    for bbox_info in bbox_data:
+        # Check if we have history for this object
+        previous = object_history.get(bbox_info["id"])
+        if previous is not None:
+            bbox_info["old_bbox"] = previous["bbox"]
+            bbox_info["prev_time"] = previous["time"]
+
+    # Objects not seen in this frame are dropped from the history
+    return {bbox_info["id"]: bbox_info for bbox_info in bbox_data}
+
+
+def publish_bbox_data(bbox_queue, bbox_data, frame_id=None, timestamp=None):
+    """
+    Replace whatever is waiting in the queue with the latest frame's detections.
+
+    Args:
+        bbox_queue: Queue shared with the GUI
+        bbox_data: List of bbox info dicts (may be empty)
+        frame_id: Frame identifier
+        timestamp: Source time of the frame in seconds
+
+    The queued item is a dict with frame_id, time and bbox_data, so frames
+    without detections still carry their id and time.
+    """
+    frame = {"frame_id": frame_id, "time": timestamp, "bbox_data": bbox_data}
+    try:
+        # Empty the queue first to avoid backlog
+        while not bbox_queue.empty():
+            bbox_queue.get_nowait()
+        # Put the new data
+        bbox_queue.put(frame, block=False)
+    except queue.Full:
+        # If queue is full, get rid of the oldest item
+        try:
+            bbox_queue.get_nowait()
+            bbox_queue.put(frame, block=False)
+        except:
+            pass
 
 
 # NOTE -  Function MEANT to be threaded...
-def stream_to_virtual_cam(stop_event, bbox_queue):
+def stream_to_virtual_cam(stop_event, bbox_queue, sinks=None):
+    # Output destinations (virtual camera unless configured otherwise)
+    if sinks is None:
+        sinks = create_sinks()
+
     # Track object history across frames
     object_history = {}
+    frame_id = 0
+    last_loop = 0
 
-    while not stop_event.is_set():
-        # Load the YOLO model
-        import torch
+    # Lens model; lookup tables are built once per frame size
+    calibration = load_calibration()
 
-        model = (
-            YOLO("models/best.pt")
-            if torch.cuda.is_available()
-            else YOLO("models/best.onnx")
-        )
+    # Drops frames that can no longer meet the end-to-end deadline
+    scheduler = FrameScheduler()
 
-        # Open the video file
-        video_path = "training/test/sample5.mp4"
-        cap = cv2.VideoCapture(video_path)
-
-        KNOWN_WIDTH = 1.8
-        FOCAL_LENGTH = 1000
-
-        def calculate_distance(bbox_width):
-            """Calculate distance using similar triangles"""
-            if bbox_width <= 0:
-                return 0
-            distance = (KNOWN_WIDTH * FOCAL_LENGTH) / bbox_width
-            return distance
-
-        # Get frame properties for the virtual camera
-        ret, frame = cap.read()
-        if not ret:
-            raise RuntimeError("Failed to read a frame from the video.")
-        height, width, _ = frame.shape
-        fps = (
-            cap.get(cv2.CAP_PROP_FPS) or 30
-        )  # default to 30 if fps cannot be determined
-
-        # Initialize the virtual camera
-        with pyvirtualcam.Camera(width=width, height=height, fps=fps) as cam:
-            # Rewind the capture to the first frame
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-
-            while cap.isOpened():
-                success, frame = cap.read()
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-                if not success:
-                    break
-
-                # Run YOLO inference on the frame
-                results = model.track(frame, persist=True, conf=0.75, verbose=False)
+    # Load the YOLO model
+    import torch
+    from ultralytics import YOLO
+
+    model = (
+        YOLO("models/best.pt") if torch.cuda.is_available() else YOLO("models/best.onnx")
+    )
+
+    # Open the video file; it is decoded ahead and loops without reopening
+    video_path = "training/test/sample5.mp4"
+    reader = PrefetchingVideoReader(video_path, loop=True).open()
 
-                # Process detections and add distance annotations
-                boxes = results[0].boxes.xyxy.cpu().numpy()
-                confs = results[0].boxes.conf.cpu().numpy()
-                ids = (
-                    results[0].boxes.id.int().cpu().tolist()
-                    if results[0].boxes.id is not None
-                    else []
-                )
-
-                # Create a list to store bbox info
-                bbox_data = []
-                current_time = time()
-
-                # Get class indices from detection results
-                cls_indices = (
-                    results[0].boxes.cls.cpu().numpy()
-                    if results[0].boxes.cls is not None
-                    else []
-                )
-                class_names = results[
-                    0
-                ].names  # Dictionary mapping indices to class names
+    KNOWN_WIDTH = 1.8
 
+    def calculate_distance(bbox):
+        """Calculate distance using the calibrated ray table"""
+        x1, _, x2, _ = bbox
+        if x2 - x1 <= 0:
+            return 0
+        _, _, distance = calibration.relative_coordinates(
+            bbox, width, height, known_width=KNOWN_WIDTH
+        )
+        return distance
+
+    # Get frame properties for the virtual camera
+    width, height, fps = reader.width, reader.height, reader.fps
+    calibration.prepare(width, height)
+
+    # Initialize the output sinks
+    for sink in sinks:
+        sink.open(width, height, fps)
+
+    try:
+        while not stop_event.is_set():
+            frame_id += 1
+
+            # Frames stay BGR; sinks that need RGB convert once in send_to_sinks
+            # (decoding runs on the reader's thread; this is only the handoff)
+            with tracer.span("capture", frame_id):
+                video_frame = reader.read(timeout=1, pace=False)
+
+            if video_frame is None:
+                continue
+
+            # Idle until the source clock reaches the frame, traced apart from work
+            with tracer.span("wait_for_source", frame_id):
+                reader.pace(video_frame)
+
+            # Far behind the source clock: jump to the frame being captured now
+            if scheduler.should_seek(video_frame.captured_at):
+                tracer.instant("seek", frame_id)
+                reader.release(video_frame)
+                reader.seek(reader.source_time(), keep_clock=True)
+                continue
+
+            # Skip stale frames before paying for inference on them
+            if not scheduler.should_process(
+                video_frame.captured_at, reader.newer_captured(video_frame)
+            ):
+                tracer.instant("skipped", frame_id)
+                reader.release(video_frame)
+                continue
+
+            started_at = perf_counter()
+            frame = video_frame.image
+
+            if video_frame.loop != last_loop:
+                # The file wrapped around, so tracks from the end are not continued
+                object_history = {}
+                last_loop = video_frame.loop
+                # Restart the tracker too, or it matches the first frame's boxes
+                # against tracks from the end of the previous pass
+                for tracker in getattr(model.predictor, "trackers", None) or []:
+                    tracker.reset()
+
+            # Run YOLO inference on the frame
+            with tracer.span("model.track", frame_id):
+                results = model.track(frame, persist=True, conf=0.75, verbose=False)
+
+            # Process detections and add distance annotations
+            boxes = results[0].boxes.xyxy.cpu().numpy()
+            confs = results[0].boxes.conf.cpu().numpy()
+            ids = (
+                results[0].boxes.id.int().cpu().tolist()
+                if results[0].boxes.id is not None
+                else []
+            )
+
+            # Create a list to store bbox info
+            bbox_data = []
+            # Source time of the frame, so velocities use true capture intervals
+            current_time = video_frame.timestamp
+
+            # Get class indices from detection results
+            cls_indices = (
+                results[0].boxes.cls.cpu().numpy()
+                if results[0].boxes.cls is not None
+                else []
+            )
+            class_names = results[0].names  # Dictionary mapping indices to class names
+
+            with tracer.span("bbox_loop", frame_id):
                 for box, conf, id, cls_idx in zip(boxes, confs, ids, cls_indices):
                     x1, y1, x2, y2 = map(int, box)
-                    distance = calculate_distance(x2 - x1)
+                    distance = calculate_distance((x1, y1, x2, y2))
                     label = class_names[int(cls_idx)]  # Convert index to label name
 
                     # Initialize with no history
                     bbox_info = {
                         "id": id,
+                        "frame_id": frame_id,
                         "bbox": (x1, y1, x2, y2),
                         "old_bbox": None,
                         "distance": distance,
@@ -96,46 +194,39 @@ def stream_to_virtual_cam(stop_event, bbox_queue):
                         "time": current_time,
                         "prev_time": None,
                         "label": label,  # Add label to bbox info
+                        "loop": video_frame.loop,  # Lets the GUI drop stale tracks
                     }
 
-                    # Check if we have history for this object
-                    if id in object_history:
-                        previous = object_history[id]
-                        bbox_info["old_bbox"] = previous["bbox"]
-                        bbox_info["prev_time"] = previous["time"]
-
                     # Add to current frame's data
                     bbox_data.append(bbox_info)
 
-                    # Update history for next frame
-                    object_history[id] = bbox_info
-
-                # Clean up history (remove objects not seen in this frame)
-                current_ids = set(ids)
-                object_history = {
-                    id: data for id, data in object_history.items() if id in current_ids
-                }
-                # Send bbox data to queue (non-blocking)
-                try:
-                    # Empty the queue first to avoid backlog
-                    while not bbox_queue.empty():
-                        bbox_queue.get_nowait()
-                    # Put the new data
-                    bbox_queue.put(bbox_data, block=False)
-                except queue.Full:
-                    # If queue is full, get rid of the oldest item
-                    try:
-                        bbox_queue.get_nowait()
-                        bbox_queue.put(bbox_data, block=False)
-                    except:
-                        pass
-
-                # Send the annotated frame to the virtual camera
-                cam.send(frame)
-                cam.sleep_until_next_frame()
-
-                if cv2.waitKey(1) & 0xFF == ord("q"):
-                    break
-
-        cap.release()
-        cv2.destroyAllWindows()
+                object_history = attach_history(bbox_data, object_history)
+
+            # Mark results that missed the deadline so consumers can discount them
+            _, late = scheduler.finish(video_frame.captured_at, started_at)
+            for bbox_info in bbox_data:
+                bbox_info["captured_at"] = video_frame.captured_at
+                bbox_info["late"] = late
+
+            # Send bbox data to queue (non-blocking)
+            with tracer.span("queue_handoff", frame_id):
+                publish_bbox_data(bbox_queue, bbox_data, frame_id, current_time)
+
+            # Send the annotated frame to the output sinks
+            with tracer.span("sinks", frame_id):
+                send_to_sinks(frame, "bgr", sinks)
+            reader.release(video_frame)
+            if not reader.realtime:
+                # Only pace on the sinks' clock when the reader is not already
+                # holding frames back to the source clock
+                for sink in sinks:
+                    sink.sleep_until_next_frame()
+
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    finally:
+        for sink in sinks:
+            sink.close()
+        reader.close()
+
+    cv2.destroyAllWindows()
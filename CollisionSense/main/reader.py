@@ -0,0 +1,293 @@
+import bisect
+import queue
+import threading
+from time import perf_counter, sleep
+
+import cv2
+import numpy as np
+
+
+class VideoFrame:
+    """A decoded frame borrowed from a PrefetchingVideoReader's buffer pool"""
+
+    __slots__ = ("index", "timestamp", "loop", "image", "epoch", "captured_at")
+
+    def __init__(self, index, timestamp, loop, image, epoch=0):
+        self.index = index  # Frame number within the file
+        self.timestamp = timestamp  # Source time in seconds, increasing across loops
+        self.loop = loop  # How many times the file has wrapped around
+        self.image = image
+        self.epoch = epoch  # Number of seeks requested before the frame was decoded
+        # perf_counter() time the frame was captured on the source clock (set by read)
+        self.captured_at = None
+
+
+def build_index(path):
+    """
+    Scan a video file for per-frame timestamps and keyframes.
+
+    Packets are read without decoding where the FFmpeg backend supports it, so this
+    is much cheaper than a full decode of the file.
+
+    Args:
+        path: Video file path
+
+    Returns:
+        Tuple (timestamps, keyframes): source time in seconds of every frame, and the
+        sorted frame numbers of keyframes (empty if the backend cannot tell)
+    """
+    has_key_frame = getattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME", None)
+    cap = None
+    if has_key_frame is not None:
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if cap is None or not cap.isOpened():
+        # Fall back to grabbing (and decoding) every frame
+        has_key_frame = None
+        cap = cv2.VideoCapture(path)
+
+    timestamps = []
+    keyframes = []
+    while cap.grab():
+        if has_key_frame is not None and cap.get(has_key_frame):
+            keyframes.append(len(timestamps))
+        timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+
+    cap.release()
+    return timestamps, keyframes
+
+
+class PrefetchingVideoReader:
+    """
+    Decodes a video file ahead of the consumer on a background thread.
+
+    Frames are decoded into a fixed pool of reusable buffers; each frame returned
+    by `read` must be handed back with `release` once the consumer is done with
+    it. A timestamp and keyframe index is built on open, so the reader can loop
+    and seek without reopening the file.
+
+    The file is played back like a live camera: the first frame read anchors the
+    source clock to perf_counter(), each frame's `captured_at` is that anchor plus
+    its timestamp, and with `realtime` set `read` does not hand out a frame before
+    it would have been captured.
+    """
+
+    def __init__(self, path, pool_size=4, loop=True, realtime=True):
+        self.path = path
+        self.pool_size = pool_size
+        self.loop = loop
+        self.realtime = realtime
+
+        self.cap = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.seek_lock = threading.Lock()
+        self.seek_target = None
+        self.epoch = 0
+        self.loop_count = 0
+        # perf_counter() time of source time 0; set by the first read
+        self.origin = None
+
+        self.free = queue.Queue()
+        self.ready = queue.Queue()
+
+    def open(self):
+        """Index the file, allocate the buffer pool and start decoding"""
+        self.timestamps, self.keyframes = build_index(self.path)
+
+        self.cap = cv2.VideoCapture(self.path)
+        success, frame = self.cap.read()
+        if not success:
+            raise RuntimeError("Failed to read a frame from the video.")
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+        self.height, self.width = frame.shape[:2]
+        # Default to 30 if fps cannot be determined
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.duration = (
+            self.timestamps[-1] + 1 / self.fps if self.timestamps else 0
+        )
+
+        for _ in range(self.pool_size):
+            self.free.put(np.empty_like(frame))
+
+        self.thread = threading.Thread(target=self._decode, daemon=True)
+        self.thread.start()
+        return self
+
+    def _decode(self):
+        epoch = 0
+        while not self.stop_event.is_set():
+            try:
+                buffer = self.free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            with self.seek_lock:
+                target, self.seek_target = self.seek_target, None
+                epoch = self.epoch
+            if target is not None:
+                self._seek_to(target)
+
+            index = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+            success, image = self.cap.read(buffer)
+            if not success:
+                self.free.put(buffer)
+                if not self.loop:
+                    self.ready.put(None)
+                    return
+                # Wrap around without reopening the file
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                self.loop_count += 1
+                continue
+
+            timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            self.ready.put(
+                VideoFrame(
+                    index,
+                    timestamp + self.loop_count * self.duration,
+                    self.loop_count,
+                    image,
+                    epoch,
+                )
+            )
+
+    def _seek_to(self, seconds):
+        # Source time keeps counting across loops; split it into loop and file time
+        loop_count = 0
+        if self.loop and self.duration:
+            loop_count = max(0, int(seconds // self.duration))
+        self.loop_count = loop_count
+        seconds -= loop_count * self.duration
+
+        target = max(0, bisect.bisect_right(self.timestamps, seconds) - 1)
+        if not self.keyframes:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            return
+
+        # Jump to the preceding keyframe, then step forward to the exact frame
+        keyframe = self.keyframes[
+            max(0, bisect.bisect_right(self.keyframes, target) - 1)
+        ]
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+        for _ in range(target - keyframe):
+            self.cap.grab()
+
+    def seek(self, seconds, keep_clock=False):
+        """
+        Continue decoding from the frame shown at `seconds` of source time.
+
+        Frames decoded before the seek are discarded by `read`.
+
+        Args:
+            seconds: Source time, counting across loops like VideoFrame.timestamp
+            keep_clock: Keep the source clock running (to catch up with it) rather
+                        than restarting it at the target frame
+        """
+        with self.seek_lock:
+            self.seek_target = seconds
+            self.epoch += 1
+            if not keep_clock:
+                self.origin = None
+
+    def source_time(self, now=None):
+        """
+        Current time on the source clock.
+
+        Args:
+            now: perf_counter() time (default: now)
+
+        Returns:
+            seconds: Source time being captured at `now`, or None before the first read
+        """
+        if self.origin is None:
+            return None
+        return (perf_counter() if now is None else now) - self.origin
+
+    def read(self, timeout=None, pace=True):
+        """
+        Return the next decoded frame.
+
+        Args:
+            timeout: Seconds to wait for the decoder (default: forever)
+            pace: Wait for the frame's capture time in realtime mode; pass False
+                  to call `pace` separately (e.g. to trace the wait on its own)
+
+        Returns:
+            frame: VideoFrame, or None at the end of a non-looping file or on timeout
+        """
+        deadline = None if timeout is None else perf_counter() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - perf_counter())
+            try:
+                frame = self.ready.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if frame is None:
+                return None
+
+            with self.seek_lock:
+                if frame.epoch != self.epoch:
+                    # Decoded before a seek
+                    self.free.put(frame.image)
+                    continue
+                if self.origin is None:
+                    self.origin = perf_counter() - frame.timestamp
+                frame.captured_at = self.origin + frame.timestamp
+
+            if pace:
+                self.pace(frame)
+            return frame
+
+    def pace(self, frame):
+        """In realtime mode, wait until the source clock reaches the frame's capture time"""
+        if self.realtime:
+            sleep(max(0, frame.captured_at - perf_counter()))
+
+    def pending(self):
+        """Number of decoded frames waiting to be read"""
+        return self.ready.qsize()
+
+    def newer_captured(self, frame, now=None):
+        """
+        Check whether the source has captured a frame after `frame`.
+
+        Decided on the source clock rather than the decode queue: the decoder runs
+        ahead of the clock, and lags behind it when the consumer holds buffers.
+
+        Args:
+            frame: VideoFrame returned by `read`
+            now: perf_counter() time (default: now)
+
+        Returns:
+            newer: True if the next frame's capture time has passed
+        """
+        current = self.source_time(now)
+        if current is None:
+            return False
+
+        file_index = frame.index + 1
+        if file_index < len(self.timestamps):
+            following = self.timestamps[file_index] + frame.loop * self.duration
+        elif self.loop:
+            following = (frame.loop + 1) * self.duration
+        else:
+            return False
+        return current >= following
+
+    def release(self, frame):
+        """Return a frame's buffer to the pool"""
+        self.free.put(frame.image)
+
+    def close(self):
+        """Stop decoding and release the file"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.cap:
+            self.cap.release()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
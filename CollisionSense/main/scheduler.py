@@ -0,0 +1,110 @@
+import os
+from time import perf_counter
+
+
+def get_deadline():
+    """End-to-end frame deadline in seconds (COLLISION_SENSE_DEADLINE_MS, default 200)"""
+    return float(os.environ.get("COLLISION_SENSE_DEADLINE_MS", 200)) / 1000
+
+
+class FrameScheduler:
+    """
+    Decides which frames are worth running inference on.
+
+    A frame's age is measured from when it was captured on the source clock,
+    not from when it was decoded, so frames decoded ahead still count as old.
+    Before inference the scheduler predicts whether the result can still be
+    delivered within the deadline, using a moving average of recent processing
+    times, and skips the frame if not and a newer frame has already been
+    captured. The newest captured frame is always processed, and so is any frame
+    once nothing has finished processing within the deadline, so the pipeline
+    keeps making progress even when processing alone exceeds the deadline; its
+    results are then marked late.
+    Once the pipeline falls more than `catch_up` behind the source, skipping
+    frames one at a time is too slow and the source should seek ahead instead.
+    """
+
+    def __init__(self, deadline=None, smoothing=0.2, catch_up=1.0):
+        """
+        Args:
+            deadline: End-to-end deadline in seconds (default: get_deadline())
+            smoothing: Weight of the newest sample in the processing time average
+            catch_up: Frame age in seconds beyond which should_seek returns True
+        """
+        self.deadline = deadline if deadline is not None else get_deadline()
+        self.smoothing = smoothing
+        self.catch_up = max(catch_up, self.deadline)
+        self.expected = 0.0
+        self.skipped = 0
+        self.seeks = 0
+        self.late = 0
+        # perf_counter() time the last processed frame finished
+        self.last_finished = None
+
+    def should_seek(self, captured_at, now=None):
+        """
+        Check whether the pipeline is too far behind the source to catch up by
+        skipping frames.
+
+        Args:
+            captured_at: perf_counter() time the frame was captured
+            now: Current perf_counter() time (default: now)
+
+        Returns:
+            seek: True if the source should jump to its current time
+        """
+        now = perf_counter() if now is None else now
+        if now - captured_at > self.catch_up:
+            self.seeks += 1
+            return True
+        return False
+
+    def should_process(self, captured_at, newer_available, now=None):
+        """
+        Check whether a frame should go through inference.
+
+        Args:
+            captured_at: perf_counter() time the frame was captured
+            newer_available: Whether a newer frame has already been captured
+            now: Current perf_counter() time (default: now)
+
+        Returns:
+            process: False if the frame should be dropped
+        """
+        now = perf_counter() if now is None else now
+        starved = self.last_finished is None or now - self.last_finished > self.deadline
+        if (
+            newer_available
+            and not starved
+            and now - captured_at + self.expected > self.deadline
+        ):
+            self.skipped += 1
+            return False
+        return True
+
+    def finish(self, captured_at, started_at, now=None):
+        """
+        Record a processed frame.
+
+        Args:
+            captured_at: perf_counter() time the frame was captured
+            started_at: perf_counter() time processing started
+            now: Current perf_counter() time (default: now)
+
+        Returns:
+            Tuple (latency, late): seconds from capture to now, and whether that
+            exceeds the deadline
+        """
+        now = perf_counter() if now is None else now
+        self.last_finished = now
+        duration = now - started_at
+        if self.expected:
+            self.expected += self.smoothing * (duration - self.expected)
+        else:
+            self.expected = duration
+
+        latency = now - captured_at
+        late = latency > self.deadline
+        if late:
+            self.late += 1
+        return latency, late
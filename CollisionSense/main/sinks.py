@@ -0,0 +1,272 @@
+import os
+import struct
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+
+# Color conversions between the formats sinks can declare
+CONVERSIONS = {
+    ("bgr", "rgb"): cv2.COLOR_BGR2RGB,
+    ("rgb", "bgr"): cv2.COLOR_RGB2BGR,
+}
+
+
+class FrameSink:
+    """
+    Destination for output frames.
+
+    Subclasses set `color_format` to the channel order they accept ("bgr" or
+    "rgb"), or None if they accept frames in any format.
+    """
+
+    color_format = "bgr"
+
+    def open(self, width, height, fps):
+        """Prepare the sink for frames of the given size and rate"""
+
+    def send(self, frame):
+        """Write a single frame"""
+        raise NotImplementedError
+
+    def sleep_until_next_frame(self):
+        """Block until the sink is ready for the next frame (no-op by default)"""
+
+    def close(self):
+        """Release the sink's resources"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class VirtualCamSink(FrameSink):
+    """Sends frames to a virtual camera (requires v4l2loopback on Linux)"""
+
+    color_format = "rgb"
+
+    def __init__(self):
+        self.cam = None
+
+    def open(self, width, height, fps):
+        # Imported lazily so other sinks work without the virtual camera driver
+        import pyvirtualcam
+
+        self.cam = pyvirtualcam.Camera(width=width, height=height, fps=fps)
+
+    def send(self, frame):
+        self.cam.send(frame)
+
+    def sleep_until_next_frame(self):
+        self.cam.sleep_until_next_frame()
+
+    def close(self):
+        if self.cam:
+            self.cam.close()
+            self.cam = None
+
+
+class NullSink(FrameSink):
+    """Discards frames; useful for benchmarking the pipeline without output cost"""
+
+    color_format = None
+
+    def __init__(self):
+        self.frames = 0
+
+    def send(self, frame):
+        self.frames += 1
+
+
+class SharedMemorySink(FrameSink):
+    """
+    Writes frames into a ring of slots in a named shared memory block.
+
+    Layout: a header of five little-endian uint32/uint64 values
+    (width, height, channels, slots, frame_count), then one uint64 sequence
+    number per slot, then the slot pixel data. Frame n (counting from 1) lives in
+    slot (n - 1) % slots. A slot's sequence number is 0 until it is first
+    written, WRITING while its pixels are being overwritten, and n once frame n
+    is complete. Readers (see SharedMemorySource) accept a copy only if the
+    sequence number was the same valid value before and after copying.
+    """
+
+    HEADER = struct.Struct("<IIIIQ")
+    SEQUENCE = struct.Struct("<Q")
+    WRITING = 2**64 - 1
+
+    def __init__(self, name="collisionsense", slots=4, color_format="bgr"):
+        self.name = name
+        self.slots = slots
+        self.color_format = color_format
+        self.shm = None
+        self.frame_size = 0
+        self.frame_count = 0
+
+    def open(self, width, height, fps):
+        channels = 3
+        self.frame_size = width * height * channels
+        self.data_offset = self.HEADER.size + self.SEQUENCE.size * self.slots
+        size = self.data_offset + self.frame_size * self.slots
+
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a previous run
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+
+        self.frame_count = 0
+        self.HEADER.pack_into(self.shm.buf, 0, width, height, channels, self.slots, 0)
+        # Every slot starts out as "never written"
+        self.shm.buf[self.HEADER.size : self.data_offset] = bytes(
+            self.data_offset - self.HEADER.size
+        )
+
+    def send(self, frame):
+        slot = self.frame_count % self.slots
+        sequence_offset = self.HEADER.size + slot * self.SEQUENCE.size
+        start = self.data_offset + slot * self.frame_size
+
+        # Mark the slot as in progress before touching its pixels
+        self.SEQUENCE.pack_into(self.shm.buf, sequence_offset, self.WRITING)
+        self.shm.buf[start : start + self.frame_size] = frame.reshape(-1).data
+
+        self.frame_count += 1
+        self.SEQUENCE.pack_into(self.shm.buf, sequence_offset, self.frame_count)
+        # Publish the frame count last so readers only look at complete slots
+        self.SEQUENCE.pack_into(
+            self.shm.buf, self.HEADER.size - self.SEQUENCE.size, self.frame_count
+        )
+
+    def close(self):
+        if self.shm:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class SharedMemorySource:
+    """Reads the newest complete frame written by a SharedMemorySink"""
+
+    def __init__(self, name="collisionsense"):
+        self.shm = shared_memory.SharedMemory(name=name)
+        header = SharedMemorySink.HEADER
+        self.width, self.height, self.channels, self.slots, _ = header.unpack_from(
+            self.shm.buf, 0
+        )
+        self.frame_size = self.width * self.height * self.channels
+        self.data_offset = header.size + SharedMemorySink.SEQUENCE.size * self.slots
+
+    def _sequence(self, offset):
+        return SharedMemorySink.SEQUENCE.unpack_from(self.shm.buf, offset)[0]
+
+    def read(self):
+        """
+        Copy the newest complete frame.
+
+        Returns:
+            Tuple (frame_number, frame), or (0, None) if no complete frame is available
+        """
+        header_size = SharedMemorySink.HEADER.size
+        frame_count = self._sequence(header_size - SharedMemorySink.SEQUENCE.size)
+        if frame_count == 0:
+            return 0, None
+
+        slot = (frame_count - 1) % self.slots
+        sequence_offset = header_size + slot * SharedMemorySink.SEQUENCE.size
+        start = self.data_offset + slot * self.frame_size
+
+        before = self._sequence(sequence_offset)
+        if before in (0, SharedMemorySink.WRITING):
+            return 0, None
+        frame = np.frombuffer(
+            self.shm.buf[start : start + self.frame_size], dtype=np.uint8
+        ).copy()
+        if self._sequence(sequence_offset) != before:
+            # Overwritten while copying
+            return 0, None
+
+        return before, frame.reshape(self.height, self.width, self.channels)
+
+    def close(self):
+        self.shm.close()
+
+
+class VideoFileSink(FrameSink):
+    """Encodes frames to a video file"""
+
+    color_format = "bgr"
+
+    def __init__(self, path, codec="mp4v"):
+        self.path = path
+        self.codec = codec
+        self.writer = None
+
+    def open(self, width, height, fps):
+        self.writer = cv2.VideoWriter(
+            self.path, cv2.VideoWriter_fourcc(*self.codec), fps, (width, height)
+        )
+
+    def send(self, frame):
+        self.writer.write(frame)
+
+    def close(self):
+        if self.writer:
+            self.writer.release()
+            self.writer = None
+
+
+def send_to_sinks(frame, frame_format, sinks):
+    """
+    Send a frame to every sink, converting it at most once per target format.
+
+    Args:
+        frame: Frame to send
+        frame_format: Channel order of `frame` ("bgr" or "rgb")
+        sinks: Iterable of FrameSink
+    """
+    converted = {frame_format: frame}
+
+    for sink in sinks:
+        target = sink.color_format or frame_format
+        if target not in converted:
+            converted[target] = cv2.cvtColor(
+                frame, CONVERSIONS[(frame_format, target)]
+            )
+        sink.send(converted[target])
+
+
+def create_sinks(spec=None):
+    """
+    Create sinks from a comma separated spec.
+
+    Args:
+        spec: e.g. "virtualcam,shm,file:out.mp4"; defaults to the
+              COLLISION_SENSE_SINKS environment variable, then "virtualcam".
+              Known names: virtualcam, null, shm[:name], file:path
+
+    Returns:
+        sinks: List of FrameSink
+    """
+    spec = spec or os.environ.get("COLLISION_SENSE_SINKS") or "virtualcam"
+
+    sinks = []
+    for entry in spec.split(","):
+        kind, _, arg = entry.strip().partition(":")
+        if kind == "virtualcam":
+            sinks.append(VirtualCamSink())
+        elif kind == "null":
+            sinks.append(NullSink())
+        elif kind == "shm":
+            sinks.append(SharedMemorySink(name=arg or "collisionsense"))
+        elif kind == "file":
+            sinks.append(VideoFileSink(arg or "output.mp4"))
+        else:
+            raise ValueError(f"Unknown output sink: {entry}")
+    return sinks
@@ -0,0 +1,346 @@
+"""
+Synthetic-scene soak and scaling harness for the detection-to-GUI pipeline.
+
+Generates synthetic detections, pushes them through the same bbox_queue handoff
+as stream_to_virtual_cam and draws them with CollisionSenseGUI.process_bounding_boxes
+without a model or a display. Reports throughput, latency percentiles, memory
+growth (tracemalloc) and the size of per-track state over the run. tracemalloc
+slows allocation-heavy code, so compare timings between runs of this harness
+rather than against the live pipeline.
+
+Usage:
+    python -m CollisionSense.main.soak --objects 200 --duration 60 --churn 0.05
+"""
+
+import argparse
+import os
+import queue
+import random
+import threading
+import tracemalloc
+from collections import deque
+from time import perf_counter, sleep, time
+
+import numpy as np
+
+from .gui import CollisionSenseGUI
+from .load import attach_history, publish_bbox_data
+
+
+MOTIONS = ("linear", "approach", "crossing", "random")
+
+
+class SyntheticScene:
+    """
+    A scene of moving synthetic detections.
+
+    Args:
+        num_objects: Number of objects kept in the scene
+        width: Frame width in pixels
+        height: Frame height in pixels
+        motion: One of MOTIONS
+        churn: Per-object, per-frame probability that the tracker assigns a new id
+        seed: Random seed
+    """
+
+    def __init__(
+        self, num_objects, width=1280, height=720, motion="linear", churn=0.0, seed=0
+    ):
+        if motion not in MOTIONS:
+            raise ValueError(f"Unknown motion pattern: {motion}")
+
+        self.width = width
+        self.height = height
+        self.motion = motion
+        self.churn = churn
+        self.rng = random.Random(seed)
+        self.next_id = 1
+        self.objects = [self.spawn() for _ in range(num_objects)]
+
+    def spawn(self):
+        """Create an object with a fresh track id"""
+        rng = self.rng
+        w = rng.uniform(30, 200)
+        obj = {
+            "id": self.next_id,
+            "cx": rng.uniform(w, self.width - w),
+            "cy": rng.uniform(self.height * 0.4, self.height * 0.8),
+            "w": w,
+            "vx": rng.uniform(-3, 3),
+            "vy": rng.uniform(-1, 1),
+            "growth": 1.0,
+            "label": rng.choice(("car", "car", "car", "person")),
+        }
+
+        if self.motion == "approach":
+            obj["vx"] *= 0.2
+            obj["growth"] = rng.uniform(1.005, 1.03)
+        elif self.motion == "crossing":
+            obj["vx"] = rng.choice((-1, 1)) * rng.uniform(4, 12)
+            obj["vy"] = 0.0
+
+        self.next_id += 1
+        return obj
+
+    def step(self):
+        """Advance the scene by one frame"""
+        rng = self.rng
+        for i, obj in enumerate(self.objects):
+            if self.motion == "random":
+                obj["vx"] += rng.gauss(0, 0.5)
+                obj["vy"] += rng.gauss(0, 0.2)
+
+            obj["cx"] += obj["vx"]
+            obj["cy"] += obj["vy"]
+            obj["w"] *= obj["growth"]
+
+            out_of_frame = (
+                not 0 < obj["cx"] < self.width
+                or not 0 < obj["cy"] < self.height
+                or obj["w"] > self.width / 2
+            )
+            if out_of_frame or rng.random() < self.churn:
+                # Lost track; the tracker hands out a new id
+                self.objects[i] = self.spawn()
+
+    def detections(self, frame_id, current_time):
+        """Bbox info dicts for the current frame, shaped like stream_to_virtual_cam's"""
+        bbox_data = []
+        for obj in self.objects:
+            half_w = obj["w"] / 2
+            half_h = obj["w"] * (0.8 if obj["label"] == "car" else 2.5) / 2
+            x1 = int(min(max(obj["cx"] - half_w, 0), self.width - 2))
+            y1 = int(min(max(obj["cy"] - half_h, 0), self.height - 2))
+            x2 = int(min(max(obj["cx"] + half_w, x1 + 2), self.width))
+            y2 = int(min(max(obj["cy"] + half_h, y1 + 2), self.height))
+
+            bbox_data.append(
+                {
+                    "id": obj["id"],
+                    "frame_id": frame_id,
+                    "bbox": (x1, y1, x2, y2),
+                    "old_bbox": None,
+                    "distance": None,
+                    "confidence": self.rng.uniform(0.75, 1.0),
+                    "time": current_time,
+                    "prev_time": None,
+                    "label": obj["label"],
+                    "captured_at": perf_counter(),
+                    "late": False,
+                }
+            )
+        return bbox_data
+
+
+def produce(scene, bbox_queue, stop_event, fps, stats):
+    """Producer thread: the synthetic stand-in for stream_to_virtual_cam"""
+    object_history = {}
+    frame_id = 0
+    interval = 1 / fps if fps else 0
+
+    while not stop_event.is_set():
+        started = perf_counter()
+        frame_id += 1
+
+        scene.step()
+        current_time = time()
+        bbox_data = scene.detections(frame_id, current_time)
+        object_history = attach_history(bbox_data, object_history)
+
+        stats["published"][frame_id] = perf_counter()
+        # Frames overwritten in the queue are never looked up; forget them
+        stats["published"].pop(frame_id - 100, None)
+        publish_bbox_data(bbox_queue, bbox_data, frame_id, current_time)
+
+        stats["produced"] = frame_id
+        stats["object_history"] = len(object_history)
+
+        if interval:
+            sleep(max(0, interval - (perf_counter() - started)))
+
+
+def percentiles(values):
+    """p50 / p95 / p99 / max of a sequence of seconds, in milliseconds"""
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(values, (50, 95, 99)) * 1000
+    return f"p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}  max {max(values) * 1000:.2f} ms"
+
+
+def run_soak(
+    objects=50,
+    duration=30.0,
+    motion="linear",
+    churn=0.0,
+    fps=30,
+    display_size=(1280, 720),
+    source_size=(1920, 1080),
+    report_every=10.0,
+    seed=0,
+):
+    """
+    Run the synthetic pipeline and report throughput, latency and memory.
+
+    Args:
+        objects: Number of objects in the scene
+        duration: Run length in seconds
+        motion: Motion pattern (see MOTIONS)
+        churn: Per-object, per-frame probability of an id change
+        fps: Producer frame rate (0 runs unpaced)
+        display_size: (width, height) of the frame the overlay is drawn on
+        source_size: (width, height) of the synthetic detection frames
+        report_every: Seconds between progress reports
+        seed: Random seed
+
+    Returns:
+        Dictionary of summary results
+    """
+    scene = SyntheticScene(
+        objects, source_size[0], source_size[1], motion=motion, churn=churn, seed=seed
+    )
+    bbox_queue = queue.Queue(maxsize=10)
+    gui = CollisionSenseGUI(bbox_queue)
+    display = np.zeros((display_size[1], display_size[0], 3), dtype=np.uint8)
+
+    stats = {"published": {}, "produced": 0, "object_history": 0}
+    stop_event = threading.Event()
+    producer = threading.Thread(
+        target=produce,
+        args=(scene, bbox_queue, stop_event, fps, stats),
+        daemon=True,
+    )
+
+    tracemalloc.start()
+    baseline = None
+    # Bounded so the harness itself does not grow over long runs
+    process_times = deque(maxlen=100_000)
+    latencies = deque(maxlen=100_000)
+    memory = []
+    processed = 0
+
+    start = perf_counter()
+    next_report = start + report_every
+    producer.start()
+
+    try:
+        while perf_counter() - start < duration:
+            try:
+                frame = bbox_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            published = stats["published"].pop(frame["frame_id"], None)
+
+            display[:] = 0
+            t0 = perf_counter()
+            gui.process_bounding_boxes(
+                display,
+                frame["bbox_data"],
+                source_size=source_size,
+                frame_id=frame["frame_id"],
+                timestamp=frame["time"],
+            )
+            t1 = perf_counter()
+
+            process_times.append(t1 - t0)
+            if published is not None:
+                latencies.append(t1 - published)
+            processed += 1
+
+            if baseline is None and processed == 100:
+                # Measure growth after warm-up caches have filled
+                baseline = tracemalloc.take_snapshot()
+
+            now = perf_counter()
+            if now >= next_report:
+                current, peak = tracemalloc.get_traced_memory()
+                memory.append((now - start, current))
+                print(
+                    f"[{now - start:7.1f}s] processed {processed} "
+                    f"({processed / (now - start):.1f} fps) | "
+                    f"process {percentiles(list(process_times)[-1000:])} | "
+                    f"mem {current / 1e6:.2f} MB (peak {peak / 1e6:.2f}) | "
+                    f"object_history {stats['object_history']} "
+                    f"track_history {len(gui.track_history)} "
+                    f"text_sprites {len(gui.text_sprites)}"
+                )
+                next_report = now + report_every
+    finally:
+        stop_event.set()
+        producer.join(timeout=2)
+
+    elapsed = perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    growth = []
+    if baseline is not None:
+        # Ignore the harness's own bookkeeping (latency samples etc.)
+        own = [tracemalloc.Filter(False, __file__)]
+        growth = (
+            tracemalloc.take_snapshot()
+            .filter_traces(own)
+            .compare_to(baseline.filter_traces(own), "lineno")[:10]
+        )
+    tracemalloc.stop()
+
+    print()
+    print(f"objects {objects}, motion {motion}, churn {churn}, ids issued {scene.next_id - 1}")
+    print(f"produced {stats['produced']} frames, processed {processed} ({processed / elapsed:.1f} fps)")
+    # Percentiles cover the most recent 100k frames
+    print(f"process_bounding_boxes: {percentiles(process_times)}")
+    print(f"publish -> drawn latency: {percentiles(latencies)}")
+    print(f"memory: current {current / 1e6:.2f} MB, peak {peak / 1e6:.2f} MB")
+    print(
+        f"state: object_history {stats['object_history']}, "
+        f"track_history {len(gui.track_history)}, text_sprites {len(gui.text_sprites)}"
+    )
+    if growth:
+        print("top memory growth since warm-up:")
+        for stat in growth:
+            print(f"  {stat}")
+
+    return {
+        "produced": stats["produced"],
+        "processed": processed,
+        "fps": processed / elapsed,
+        "process_times": list(process_times),
+        "latencies": list(latencies),
+        "memory": memory,
+        "peak_memory": peak,
+        "object_history": stats["object_history"],
+        "track_history": len(gui.track_history),
+        "text_sprites": len(gui.text_sprites),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--motion", choices=MOTIONS, default="linear")
+    parser.add_argument("--churn", type=float, default=0.0)
+    parser.add_argument("--fps", type=float, default=30, help="0 runs unpaced")
+    parser.add_argument("--display", default="1280x720", help="WIDTHxHEIGHT")
+    parser.add_argument("--source", default="1920x1080", help="WIDTHxHEIGHT")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds")
+    parser.add_argument("--debug", action="store_true", help="draw debug text too")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.debug:
+        os.environ["COLLISION_SENSE_DEBUG"] = "true"
+
+    run_soak(
+        objects=args.objects,
+        duration=args.duration,
+        motion=args.motion,
+        churn=args.churn,
+        fps=args.fps,
+        display_size=tuple(int(v) for v in args.display.split("x")),
+        source_size=tuple(int(v) for v in args.source.split("x")),
+        report_every=args.report_every,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import itertools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter_ns
+
+
+class Tracer:
+    """
+    Records per-frame spans into a fixed-size in-memory ring buffer.
+
+    Writers never take a lock: each span claims a slot from an atomic counter
+    and overwrites whatever was there, so only the most recent `capacity` spans
+    are kept. Spans are exported in Chrome trace-event format, which opens in
+    chrome://tracing or Perfetto.
+    """
+
+    def __init__(self, capacity=1 << 16, enabled=True):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.buffer = [None] * capacity
+        self.counter = itertools.count()
+        self.origin = perf_counter_ns()
+
+    @contextmanager
+    def span(self, name, frame_id=None):
+        """Record the duration of the enclosed block as a span"""
+        if not self.enabled:
+            yield
+            return
+
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, start, perf_counter_ns(), frame_id)
+
+    def record(self, name, start, end, frame_id=None):
+        """Record a span from perf_counter_ns start and end times"""
+        if not self.enabled:
+            return
+        # next() on itertools.count is atomic under the GIL
+        slot = next(self.counter) % self.capacity
+        self.buffer[slot] = (
+            name,
+            start,
+            end,
+            frame_id,
+            threading.get_ident(),
+            threading.current_thread().name,
+        )
+
+    def instant(self, name, frame_id=None):
+        """Record a point event, such as a dropped frame, at the current time"""
+        if not self.enabled:
+            return
+        now = perf_counter_ns()
+        self.record(name, now, now, frame_id)
+
+    def export(self, path):
+        """
+        Write the buffered spans to a Chrome trace-event JSON file.
+
+        Args:
+            path: Output file path
+        """
+        spans = [span for span in list(self.buffer) if span is not None]
+        spans.sort(key=lambda span: span[1])
+
+        pid = os.getpid()
+        events = []
+        thread_names = {}
+        for name, start, end, frame_id, tid, thread_name in spans:
+            thread_names[tid] = thread_name
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.origin) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": pid,
+                "tid": tid,
+                "args": {"frame": frame_id},
+            }
+            if start == end:
+                # Thread-scoped instant event rather than an invisible span
+                event["ph"] = "i"
+                event["s"] = "t"
+                del event["dur"]
+            events.append(event)
+
+        for tid, thread_name in thread_names.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+            )
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# Enabled when COLLISION_SENSE_TRACE names the file to export to
+TRACE_PATH = os.environ.get("COLLISION_SENSE_TRACE")
+tracer = Tracer(enabled=bool(TRACE_PATH))
+
+
+def export_trace(path=None):
+    """Export the global tracer to `path` (default: COLLISION_SENSE_TRACE)"""
+    path = path or TRACE_PATH
+    if tracer.enabled and path:
+        tracer.export(path)
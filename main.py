@@ -2,14 +2,26 @@ import os
 
 os.environ["COLLISION_SENSE_DEBUG"] = "true"
 
-from CollisionSense.main import stream_to_virtual_cam, show_gui
+from CollisionSense.main import (
+    stream_to_virtual_cam,
+    show_gui,
+    start_event_server,
+    export_trace,
+)
+import signal
 import time
 import threading
 import queue
 
 # FIXME - Sometimes, doesn't work unless you do modprobe v4l2loopback..
+# The GUI reads the virtual camera (VideoCapture(0)), so it needs the virtualcam sink;
+# COLLISION_SENSE_SINKS can add shm or file:out.mp4 outputs alongside it
 
 stop_event = threading.Event()
+# Risk events for local clients, if COLLISION_SENSE_EVENTS is set
+event_server = start_event_server()
+# Dump the trace (if COLLISION_SENSE_TRACE is set) on demand with `kill -USR1`
+signal.signal(signal.SIGUSR1, lambda signum, frame: export_trace())
 bbox_queue = queue.Queue(maxsize=10)  # Limit queue size to avoid memory issues
 
 virtual_cam_thread = threading.Thread(
@@ -22,7 +34,7 @@ try:
 
     time.sleep(1)
 
-    show_gui(bbox_queue)
+    show_gui(bbox_queue, event_server)
 
 except KeyboardInterrupt:
     print("\nKeyboardInterrupt detected. Stopping thread...")
@@ -31,4 +43,7 @@ except Exception:
     stop_event.set()
 finally:
     virtual_cam_thread.join(timeout=2)
+    if event_server:
+        event_server.stop()
+    export_trace()
     print("Thread stopped.")
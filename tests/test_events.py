@@ -0,0 +1,104 @@
+import json
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from CollisionSense.main.events import RiskEventServer
+
+
+@pytest.fixture
+def server():
+    server = RiskEventServer("tcp:127.0.0.1:0", buffer_size=4)
+    server.start()
+    yield server
+    server.stop()
+
+
+def connect(server, count):
+    """Open `count` subscriber sockets and wait until the server has them all"""
+    port = server.server.sockets[0].getsockname()[1]
+    clients = [socket.create_connection(("127.0.0.1", port), timeout=2) for _ in range(count)]
+    give_up = time.monotonic() + 2
+    while len(server.clients) < count and time.monotonic() < give_up:
+        time.sleep(0.01)
+    assert len(server.clients) == count
+    return clients
+
+
+def read_messages(client, count):
+    """Read `count` JSON lines from a subscriber socket"""
+    stream = client.makefile("r")
+    return [json.loads(stream.readline()) for _ in range(count)]
+
+
+def test_publish_reaches_every_subscriber(server):
+    clients = connect(server, 3)
+    objects = [{"id": 7, "label": "car", "risk": 2}]
+    for frame_id in range(1, 4):
+        server.publish(frame_id, frame_id / 30, objects)
+
+    for client in clients:
+        messages = read_messages(client, 3)
+        assert [message["frame"] for message in messages] == [1, 2, 3]
+        assert messages[0]["objects"] == objects
+        client.close()
+
+
+def test_slow_subscriber_drops_oldest_frames(server):
+    (client,) = connect(server, 1)
+
+    # Hold the server's loop so every frame is buffered before the client is served
+    release = threading.Event()
+    server.loop.call_soon_threadsafe(release.wait)
+    for frame_id in range(1, 11):
+        server.publish(frame_id, None, [])
+    release.set()
+
+    messages = read_messages(client, 4)
+    assert [message["frame"] for message in messages] == [7, 8, 9, 10]
+    (state,) = server.clients
+    assert state.dropped == 6
+    client.close()
+
+
+@pytest.mark.parametrize("address", ["foo:bar", "tcp:127.0.0.1:notaport"])
+def test_start_raises_when_server_cannot_listen(address):
+    server = RiskEventServer(address)
+    with pytest.raises(ValueError):
+        server.start()
+
+    # Safe to call on a server that never started
+    server.publish(1, 0.0, [])
+    server.stop()
+
+
+class RecordingServer:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, frame_id, timestamp, objects):
+        self.published.append((frame_id, timestamp, objects))
+
+
+def test_frames_without_detections_keep_their_id_and_time():
+    gui_module = pytest.importorskip("CollisionSense.main.gui")
+    from CollisionSense.main.load import publish_bbox_data
+
+    events = RecordingServer()
+    gui = gui_module.CollisionSenseGUI(queue.Queue(), event_server=events)
+
+    bbox_queue = queue.Queue(maxsize=10)
+    publish_bbox_data(bbox_queue, [], frame_id=42, timestamp=1.4)
+    frame = bbox_queue.get_nowait()
+
+    gui.process_bounding_boxes(
+        np.zeros((48, 64, 3), dtype=np.uint8),
+        frame["bbox_data"],
+        frame_id=frame["frame_id"],
+        timestamp=frame["time"],
+    )
+    assert events.published == [(42, 1.4, [])]
@@ -0,0 +1,102 @@
+from time import perf_counter, sleep
+
+import cv2
+import numpy as np
+import pytest
+
+from CollisionSense.main.reader import PrefetchingVideoReader
+
+
+FRAMES = 12
+FPS = 30
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """A short MJPG clip whose frame n is filled with the value 10 * n"""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (32, 24))
+    for n in range(FRAMES):
+        writer.write(np.full((24, 32, 3), 10 * n, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def read_frames(reader, count):
+    frames = []
+    for _ in range(count):
+        frame = reader.read(timeout=2)
+        assert frame is not None
+        frames.append((frame.index, frame.loop, frame.timestamp, int(frame.image.mean())))
+        reader.release(frame)
+    return frames
+
+
+def test_loop_timestamps_keep_increasing(video_path):
+    with PrefetchingVideoReader(video_path, realtime=False) as reader:
+        frames = read_frames(reader, 2 * FRAMES + 3)
+
+    assert [index for index, _, _, _ in frames] == (list(range(FRAMES)) * 3)[: 2 * FRAMES + 3]
+    assert [loop for _, loop, _, _ in frames] == [n // FRAMES for n in range(2 * FRAMES + 3)]
+
+    timestamps = [timestamp for _, _, timestamp, _ in frames]
+    assert all(b > a for a, b in zip(timestamps, timestamps[1:]))
+    for index, loop, timestamp, _ in frames:
+        assert timestamp == pytest.approx(
+            reader.timestamps[index] + loop * reader.duration
+        )
+
+
+def test_non_looping_reader_ends(video_path):
+    with PrefetchingVideoReader(video_path, loop=False, realtime=False) as reader:
+        read_frames(reader, FRAMES)
+        assert reader.read(timeout=2) is None
+
+
+def test_seek_discards_frames_decoded_before_it(video_path):
+    with PrefetchingVideoReader(video_path, realtime=False) as reader:
+        read_frames(reader, 1)
+        # Let the decoder fill the pool with frames from before the seek
+        give_up = perf_counter() + 2
+        while reader.pending() < reader.pool_size - 1 and perf_counter() < give_up:
+            sleep(0.001)
+
+        reader.seek(reader.timestamps[8])
+        (index, loop, _, value), = read_frames(reader, 1)
+        assert (index, loop) == (8, 0)
+        assert value == pytest.approx(80, abs=4)
+
+        # Seeks take source time, so they can land in a later loop
+        reader.seek(reader.duration + reader.timestamps[3])
+        (index, loop, timestamp, _), = read_frames(reader, 1)
+        assert (index, loop) == (3, 1)
+        assert timestamp == pytest.approx(reader.duration + reader.timestamps[3])
+
+
+def test_frames_are_captured_on_the_source_clock(video_path):
+    with PrefetchingVideoReader(video_path) as reader:
+        first = reader.read(timeout=2)
+        assert first.captured_at == pytest.approx(reader.origin + first.timestamp)
+        assert not reader.newer_captured(first)
+
+        following_at = reader.origin + reader.timestamps[1]
+        assert reader.newer_captured(first, now=following_at + 1e-6)
+        reader.release(first)
+
+        # Not handed out before it would have been captured
+        second = reader.read(timeout=2)
+        assert perf_counter() >= second.captured_at
+        assert second.captured_at == pytest.approx(following_at)
+        reader.release(second)
+
+
+def test_read_without_pacing_returns_decoded_frame_early(video_path):
+    with PrefetchingVideoReader(video_path) as reader:
+        reader.release(reader.read(timeout=2))
+
+        frame = reader.read(timeout=2, pace=False)
+        # Decoded ahead, so it is handed over before its capture time
+        assert perf_counter() < frame.captured_at
+        reader.pace(frame)
+        assert perf_counter() >= frame.captured_at
+        reader.release(frame)
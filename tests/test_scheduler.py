@@ -0,0 +1,114 @@
+import pytest
+
+from CollisionSense.main.scheduler import FrameScheduler
+
+
+FPS = 30
+
+
+def simulate(scheduler, processing_time, duration=6.0, skip_time=0.001):
+    """
+    Feed a 30 fps source through the scheduler on a simulated clock.
+
+    Frames are read in order like PrefetchingVideoReader does; a frame is never
+    read before it is captured.
+
+    Returns:
+        Tuple (processed, ages) with the frame numbers processed and their age
+        when processing started
+    """
+    now = 0.0
+    frame = 0
+    processed = []
+    ages = []
+    while frame / FPS < duration:
+        captured_at = frame / FPS
+        now = max(now, captured_at)
+        newer_available = now >= (frame + 1) / FPS
+
+        if scheduler.should_process(captured_at, newer_available, now=now):
+            processed.append(frame)
+            ages.append(now - captured_at)
+            started_at = now
+            now += processing_time
+            scheduler.finish(captured_at, started_at, now=now)
+        else:
+            now += skip_time
+        frame += 1
+    return processed, ages
+
+
+def test_fast_processing_keeps_every_frame():
+    scheduler = FrameScheduler(deadline=0.2)
+    processed, ages = simulate(scheduler, processing_time=0.02)
+
+    assert len(processed) == 6 * FPS
+    assert scheduler.skipped == 0
+    assert scheduler.late == 0
+    assert max(ages) == pytest.approx(0)
+
+
+def test_slow_processing_still_makes_progress():
+    scheduler = FrameScheduler(deadline=0.2)
+    processed, ages = simulate(scheduler, processing_time=0.25)
+
+    # Roughly one frame per processing interval, each the newest captured one
+    assert len(processed) >= 20
+    assert scheduler.skipped > 0
+    assert max(ages[1:]) < 1 / FPS + 0.01
+    # Processing alone misses the deadline, so every result is late
+    assert scheduler.late == len(processed)
+
+
+def test_skips_stale_frame_when_newer_available():
+    scheduler = FrameScheduler(deadline=0.2)
+    scheduler.finish(captured_at=0.0, started_at=0.0, now=0.05)
+
+    assert not scheduler.should_process(captured_at=-0.2, newer_available=True, now=0.1)
+    assert scheduler.skipped == 1
+    # The newest frame is processed however old it is
+    assert scheduler.should_process(captured_at=-0.2, newer_available=False, now=0.1)
+
+
+def test_processes_stale_frame_when_starved():
+    scheduler = FrameScheduler(deadline=0.2)
+    scheduler.finish(captured_at=0.0, started_at=0.0, now=0.05)
+
+    # Nothing finished within the deadline, so even a stale frame goes through
+    assert scheduler.should_process(captured_at=0.0, newer_available=True, now=0.3)
+
+
+def test_expected_processing_time_counts_towards_deadline():
+    scheduler = FrameScheduler(deadline=0.2)
+    scheduler.finish(captured_at=0.0, started_at=0.0, now=0.15)
+
+    # 0.1 s old plus 0.15 s of expected processing misses the deadline
+    assert not scheduler.should_process(captured_at=0.1, newer_available=True, now=0.2)
+    assert scheduler.should_process(captured_at=0.19, newer_available=True, now=0.2)
+
+
+def test_finish_reports_latency_and_late():
+    scheduler = FrameScheduler(deadline=0.2)
+
+    latency, late = scheduler.finish(captured_at=1.0, started_at=1.05, now=1.1)
+    assert latency == pytest.approx(0.1)
+    assert not late
+
+    latency, late = scheduler.finish(captured_at=1.0, started_at=1.2, now=1.3)
+    assert latency == pytest.approx(0.3)
+    assert late
+    assert scheduler.late == 1
+
+
+def test_should_seek_when_far_behind():
+    scheduler = FrameScheduler(deadline=0.2, catch_up=1.0)
+
+    assert not scheduler.should_seek(captured_at=0.0, now=0.9)
+    assert scheduler.should_seek(captured_at=0.0, now=1.1)
+    assert scheduler.seeks == 1
+
+
+def test_catch_up_is_at_least_the_deadline():
+    scheduler = FrameScheduler(deadline=2.0, catch_up=1.0)
+
+    assert not scheduler.should_seek(captured_at=0.0, now=1.5)
@@ -0,0 +1,134 @@
+import importlib
+import sys
+import uuid
+
+import cv2
+import numpy as np
+import pytest
+
+from CollisionSense.main import sinks
+from CollisionSense.main.sinks import (
+    FrameSink,
+    NullSink,
+    SharedMemorySink,
+    SharedMemorySource,
+    VideoFileSink,
+    send_to_sinks,
+)
+
+
+WIDTH, HEIGHT = 64, 48
+
+
+def make_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+
+class RecordingSink(FrameSink):
+    def __init__(self, color_format):
+        self.color_format = color_format
+        self.frames = []
+
+    def send(self, frame):
+        self.frames.append(frame)
+
+
+def test_null_sink_counts_frames():
+    with NullSink() as sink:
+        sink.open(WIDTH, HEIGHT, 30)
+        send_to_sinks(make_frame(), "bgr", [sink])
+        send_to_sinks(make_frame(), "bgr", [sink])
+
+    assert sink.frames == 2
+
+
+def test_shared_memory_round_trip():
+    sink = SharedMemorySink(name=f"cs-test-{uuid.uuid4().hex[:8]}", slots=2)
+    sink.open(WIDTH, HEIGHT, 30)
+    try:
+        source = SharedMemorySource(sink.name)
+        assert source.read() == (0, None)
+
+        for i in range(3):
+            frame = make_frame(i)
+            sink.send(frame)
+            number, copy = source.read()
+            assert number == i + 1
+            np.testing.assert_array_equal(copy, frame)
+        source.close()
+    finally:
+        sink.close()
+
+
+def test_shared_memory_rejects_slot_being_written():
+    sink = SharedMemorySink(name=f"cs-test-{uuid.uuid4().hex[:8]}", slots=1)
+    sink.open(WIDTH, HEIGHT, 30)
+    try:
+        sink.send(make_frame())
+        source = SharedMemorySource(sink.name)
+        # Simulate the writer having started to overwrite the slot
+        SharedMemorySink.SEQUENCE.pack_into(
+            sink.shm.buf, SharedMemorySink.HEADER.size, SharedMemorySink.WRITING
+        )
+        assert source.read() == (0, None)
+        source.close()
+    finally:
+        sink.close()
+
+
+def test_video_file_round_trip(tmp_path):
+    path = str(tmp_path / "out.avi")
+    # Flat color survives lossy encoding closely
+    frame = np.full((HEIGHT, WIDTH, 3), (40, 120, 200), dtype=np.uint8)
+
+    sink = VideoFileSink(path, codec="MJPG")
+    sink.open(WIDTH, HEIGHT, 30)
+    for _ in range(3):
+        send_to_sinks(frame, "bgr", [sink])
+    sink.close()
+
+    cap = cv2.VideoCapture(path)
+    success, decoded = cap.read()
+    cap.release()
+
+    assert success
+    assert decoded.shape == frame.shape
+    assert np.abs(decoded.astype(int) - frame).max() <= 8
+
+
+def test_send_to_sinks_converts_once_per_format(monkeypatch):
+    calls = []
+    convert = cv2.cvtColor
+
+    def counting_cvt_color(frame, code):
+        calls.append(code)
+        return convert(frame, code)
+
+    monkeypatch.setattr(sinks.cv2, "cvtColor", counting_cvt_color)
+
+    targets = [
+        RecordingSink("rgb"),
+        RecordingSink("rgb"),
+        RecordingSink("bgr"),
+        RecordingSink(None),
+    ]
+    frame = make_frame()
+    send_to_sinks(frame, "bgr", targets)
+
+    assert calls == [cv2.COLOR_BGR2RGB]
+    assert targets[0].frames[0] is targets[1].frames[0]
+    np.testing.assert_array_equal(targets[0].frames[0], frame[..., ::-1])
+    assert targets[2].frames[0] is frame
+    assert targets[3].frames[0] is frame
+
+
+def test_sinks_import_without_pyvirtualcam(monkeypatch):
+    # A None entry makes any import of pyvirtualcam raise ImportError
+    monkeypatch.setitem(sys.modules, "pyvirtualcam", None)
+    module = importlib.reload(sinks)
+
+    virtualcam, null = module.create_sinks("virtualcam,null")
+    assert isinstance(null, module.NullSink)
+    with pytest.raises(ImportError):
+        virtualcam.open(WIDTH, HEIGHT, 30)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from CollisionSense.logic.trajectory import (
+    TrackHistory,
+    fit_constant_acceleration,
+    predict_trajectories,
+    stack_histories,
+)
+
+
+DT = 1 / 30
+
+
+def make_track(count, velocity, acceleration=(0.0, 0.0), start=(1.0, 20.0)):
+    """Noise-free (t, x, z) samples at 30 fps"""
+    samples = []
+    for k in range(count):
+        t = k * DT
+        x = start[0] + velocity[0] * t + 0.5 * acceleration[0] * t**2
+        z = start[1] + velocity[1] * t + 0.5 * acceleration[1] * t**2
+        samples.append((100.0 + t, x, z))
+    return samples
+
+
+def fit(history):
+    return fit_constant_acceleration(*stack_histories([history]))
+
+
+@pytest.mark.parametrize("count", [2, 3, 10])
+def test_constant_velocity_is_recovered_exactly(count):
+    history = make_track(count, (1.0, -10.0))
+    p0, v, a = fit(history)
+
+    np.testing.assert_allclose(p0[0], history[-1][1:], atol=1e-9)
+    np.testing.assert_allclose(v[0], (1.0, -10.0), atol=1e-9)
+    np.testing.assert_allclose(a[0], (0.0, 0.0), atol=1e-6)
+
+
+def test_constant_acceleration_is_recovered_exactly():
+    history = make_track(10, (1.0, -10.0), acceleration=(0.5, -3.0))
+    p0, v, a = fit(history)
+
+    # Velocity is reported at the newest sample
+    elapsed = 9 * DT
+    np.testing.assert_allclose(p0[0], history[-1][1:], atol=1e-9)
+    np.testing.assert_allclose(v[0], (1.0 + 0.5 * elapsed, -10.0 - 3.0 * elapsed), atol=1e-9)
+    np.testing.assert_allclose(a[0], (0.5, -3.0), atol=1e-6)
+
+
+def test_single_sample_is_stationary():
+    p0, v, a = fit([(5.0, 2.0, 30.0)])
+
+    np.testing.assert_allclose(p0[0], (2.0, 30.0))
+    np.testing.assert_allclose(v[0], (0.0, 0.0))
+    np.testing.assert_allclose(a[0], (0.0, 0.0))
+
+
+def test_predicted_path_follows_motion():
+    history = make_track(5, (0.0, -10.0), start=(0.0, 20.0))
+    prediction = predict_trajectories([history], horizon=10, dt=0.1)
+
+    assert prediction["paths"].shape == (1, 10, 2)
+    np.testing.assert_allclose(
+        prediction["paths"][0, -1], (0.0, history[-1][2] - 10.0), atol=1e-9
+    )
+
+
+def test_track_history_matches_list_histories():
+    histories = {
+        1: make_track(12, (1.0, -10.0), acceleration=(0.0, -3.0)),
+        2: make_track(2, (-2.0, 5.0)),
+    }
+    track_history = TrackHistory(max_len=10, capacity=1)
+
+    for k in range(12):
+        ids = [track_id for track_id, h in histories.items() if k < len(h)]
+        slots = track_history.update(
+            ids,
+            [histories[i][k][0] for i in ids],
+            [histories[i][k][1:] for i in ids],
+        )
+
+    expected = predict_trajectories([histories[1]], max_len=10)
+    np.testing.assert_allclose(
+        track_history.predict(slots)["velocity"], expected["velocity"], atol=1e-9
+    )
+    # Track 2 was not updated in the last frame, so it is forgotten
+    assert len(track_history) == 1
+
+
+def test_track_history_restarts_when_time_goes_backwards():
+    track_history = TrackHistory(max_len=5)
+    for t in (1.0, 2.0, 3.0):
+        track_history.update([7], [t], [(t, 0.0)])
+
+    slots = track_history.update([7], [0.5], [(9.0, 9.0)])
+
+    assert track_history.counts[slots[0]] == 1
+    np.testing.assert_allclose(track_history.predict(slots)["velocity"], [[0.0, 0.0]])